@@ -5,87 +5,197 @@ Real-time pricing recommendations with date picker and calendar view
 ORGANIZED BACKEND STRUCTURE VERSION
 """
 
-from flask import Flask, render_template, request, jsonify, make_response
+from flask import Flask, render_template, request, jsonify, make_response, Response, stream_with_context
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta, date
-import json
+from functools import lru_cache
+from itertools import groupby
+from operator import itemgetter
+import asyncio
+import fcntl
+import msgpack
+import orjson
 import os
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
 from dotenv import load_dotenv
 import sqlalchemy
 from sqlalchemy import create_engine, text
 import logging
 import sys
+import threading
+import time
 
 # Add parent directory to path to import auth module
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from auth import authenticate_user, generate_token, verify_token, login_required, admin_required, get_current_user
+from scripts.csv_to_parquet import is_fresh
 
-# Custom JSON encoder to handle NaN values
-class NanSafeJSONEncoder(json.JSONEncoder):
-    def encode(self, obj):
-        if isinstance(obj, float) and (np.isnan(obj) or np.isinf(obj)):
-            return 'null'
-        return super().encode(obj)
-    
-    def iterencode(self, obj, _one_shot=False):
-        if isinstance(obj, float) and (np.isnan(obj) or np.isinf(obj)):
-            yield 'null'
-        elif isinstance(obj, dict):
-            yield '{'
-            first = True
-            for key, value in obj.items():
-                if not first:
-                    yield ','
-                first = False
-                yield json.dumps(key)
-                yield ':'
-                if isinstance(value, float) and (np.isnan(value) or np.isinf(value)):
-                    yield 'null'
-                else:
-                    yield from self.iterencode(value, True)
-            yield '}'
-        elif isinstance(obj, list):
-            yield '['
-            first = True
-            for item in obj:
-                if not first:
-                    yield ','
-                first = False
-                if isinstance(item, float) and (np.isnan(item) or np.isinf(item)):
-                    yield 'null'
-                else:
-                    yield from self.iterencode(item, True)
-            yield ']'
-        else:
-            yield from super().iterencode(obj, _one_shot)
+# orjson-backed JSON provider: NaN/Inf serialize as null natively and numpy
+# scalars/arrays are encoded in C, so responses need no Python-level cleaning
+def _orjson_default(obj):
+    """Fallback serializer for types orjson does not handle natively"""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+def _dumps(obj) -> bytes:
+    return orjson.dumps(obj, default=_orjson_default, option=ORJSON_OPTIONS)
+
+# MessagePack is offered to clients that send Accept: application/msgpack
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+def _msgpack_default(obj):
+    """Fallback serializer for types msgpack does not handle natively"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return _orjson_default(obj)
+
+def _packb(obj) -> bytes:
+    return msgpack.packb(obj, use_bin_type=True, default=_msgpack_default)
+
+class OrjsonProvider(JSONProvider):
+    def dumps(self, obj, **kwargs):
+        return _dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 # Load environment variables
 load_dotenv()
 
 app = Flask(__name__)
 app.secret_key = 'revenue_management_secret_key'
-app.json_encoder = NanSafeJSONEncoder
+app.json = OrjsonProvider(app)
 
 # Enable CORS for Next.js frontend with credentials
 frontend_url = os.getenv('FRONTEND_URL', 'http://localhost:3000')
 CORS(app, origins=[frontend_url], supports_credentials=True)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging (LOG_LEVEL=WARNING in production keeps INFO records off the request path)
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper())
 logger = logging.getLogger(__name__)
 
+# Columns the recommendation path reads from combined_df, and their narrowest dtypes
+# (nullable, so a blank cell reads as NA instead of failing the whole load)
+COMBINED_COLUMNS = [
+    'Date', 'Room Type', 'Arrangement', 'Average Room Rate', 'Occupancy Rate', 'Occ', 'Predicted_Occupancy',
+    'Is_Holiday', 'Is_SchoolHoliday', 'Is_Event', 'Is_Weekend', 'Is_Fasting', 'Is_Bridge',
+    'Holiday_Duration', 'Days_of_Holiday', 'Distance_to_Holiday', 'Day_of_Week',
+]
+COMBINED_DTYPES = {
+    'Room Type': 'category',
+    'Arrangement': 'category',
+    'Is_Holiday': 'boolean',
+    'Is_SchoolHoliday': 'boolean',
+    'Is_Event': 'boolean',
+    'Is_Weekend': 'boolean',
+    'Is_Fasting': 'boolean',
+    'Is_Bridge': 'boolean',
+    'Holiday_Duration': 'Int16',
+    'Days_of_Holiday': 'Int16',
+    'Distance_to_Holiday': 'Int16',
+    'Day_of_Week': 'Int8',
+}
+
+# Refresh pipeline: script -> scripts it waits for. Scripts whose dependencies are done run concurrently
+# (csv_to_parquet runs last so the live dataset is only swapped once the rest of the refresh has finished)
+REFRESH_PIPELINE = {
+    'data_extraction': [],
+    'forecast': ['data_extraction'],
+    'fix_transparency': ['forecast'],
+    'csv_to_parquet': ['fix_transparency'],
+}
+
+# Gunicorn runs several workers, each with its own copy of the data. The one that runs a refresh
+# touches REFRESH_STAMP; the others compare its mtime (at most every STALE_CHECK_SECONDS) and reload
+REFRESH_STAMP = '.refresh_stamp'
+REFRESH_LOCK = '.refresh.lock'
+STALE_CHECK_SECONDS = 1.0
+
+def _prepare_combined(df):
+    """Coerce ARR and derive the normalized 0..1 occupancy column (__occ) once per frame"""
+    if 'Average Room Rate' in df.columns:
+        df['Average Room Rate'] = pd.to_numeric(df['Average Room Rate'], errors='coerce')
+    
+    # Robust occupancy derivation into __occ
+    df['__occ'] = np.nan
+    if 'Occupancy Rate' in df.columns:
+        if df['Occupancy Rate'].dtype == object:
+            # String occupancy ("63%", "63.3", "0.633"); percentages and values >1 are scaled
+            occ_str = df['Occupancy Rate'].astype('string').str.strip()
+            is_pct = occ_str.str.endswith('%').fillna(False).to_numpy(dtype=bool)
+            occ_num = pd.to_numeric(occ_str.str.replace('%', '', regex=False), errors='coerce')
+            occ_num = occ_num.to_numpy(dtype=float, na_value=np.nan)
+            df['__occ'] = np.where(is_pct | (occ_num > 1.0), occ_num / 100.0, occ_num)
+        else:
+            # Numeric occupancy; normalize if >1 (assume percentage)
+            occ_num = pd.to_numeric(df['Occupancy Rate'], errors='coerce')
+            df['__occ'] = occ_num.where(occ_num <= 1.0, occ_num/100.0)
+
+    # Fill from alternate columns if still NaN
+    for alt_col in ('Occ', 'Predicted_Occupancy'):
+        if alt_col in df.columns:
+            df['__occ'] = df['__occ'].fillna(pd.to_numeric(df[alt_col], errors='coerce'))
+    return df
+
+def _derive_pricing(arr, occ, is_holiday, is_fasting):
+    """Fused per-row pricing derivation over contiguous numpy columns
+    
+    ARR is floored at 0, occupancy clamped to 0..1 (NaN -> 0 for both), and fasting days are never holidays.
+    """
+    arr_out = np.where(arr > 0.0, arr, 0.0)
+    occ_out = np.where(occ > 0.0, np.minimum(occ, 1.0), 0.0)
+    return arr_out, occ_out, is_holiday & ~is_fasting
+
+# Built aside and published with a single assignment, so requests running
+# during a reload keep reading the previous snapshot whole
+class DataSnapshot:
+    """Everything one load of the data folder produced"""
+    __slots__ = ('version', 'combined_ds', 'combined', 'combined_index', 'holiday_dates', 'holiday_details', 'calendar_payloads')
+
+    def __init__(self, version=0):
+        # Bumped on every (re)load; part of the response cache keys below
+        self.version = version
+        # Memory-mapped Parquet dataset, or else the CSV as an Arrow table with its searchsorted index
+        self.combined_ds = None
+        self.combined = None
+        self.combined_index = None
+        self.holiday_dates = None
+        self.holiday_details = None
+        # Encoded calendar JSON per (year, month) the data covers
+        self.calendar_payloads = {}
+
 class RevenueManager:
     def __init__(self):
-        self.data_cache = {}
         self.last_refresh = None
+        self._data = DataSnapshot()
+        # REFRESH_STAMP mtime the loaded data reflects, and when it was last checked
+        self._loaded_stamp = None
+        self._stamp_checked_at = 0.0
+        self._reload_lock = threading.Lock()
         
         # Set absolute paths for data and scripts
         self.backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         self.data_dir = os.path.join(self.backend_root, 'data')
         self.scripts_dir = os.path.join(self.backend_root, 'scripts')
 
+    @property
+    def data_version(self):
+        return self._data.version
+
+    @property
+    def calendar_payloads(self):
+        return self._data.calendar_payloads
         
     def connect_db(self):
         """Connect to PostgreSQL database"""
@@ -97,50 +207,154 @@ class RevenueManager:
             engine = create_engine(database_url)
             return engine
         except Exception as e:
-            logger.error(f"Database connection failed: {e}")
+            logger.error("Database connection failed: %s", e)
             return None
     
+    async def _run_script(self, name):
+        """Run scripts/<name>.py in its own interpreter process; returns True on success"""
+        script = os.path.join('scripts', f'{name}.py')
+        if not os.path.exists(os.path.join(self.backend_root, script)):
+            logger.warning("Refresh step %s not found, skipping", script)
+            return True
+        
+        proc = await asyncio.create_subprocess_exec(sys.executable, script, cwd=self.backend_root)
+        returncode = await proc.wait()
+        if returncode != 0:
+            logger.error("Refresh step %s exited with code %d", script, returncode)
+        return returncode == 0
+    
+    async def _run_refresh_pipeline(self):
+        """Run REFRESH_PIPELINE, starting each script as soon as its dependencies succeed"""
+        tasks = {}
+        
+        async def run(name):
+            deps_ok = await asyncio.gather(*(tasks[dep] for dep in REFRESH_PIPELINE[name]))
+            if not all(deps_ok):
+                logger.error("Skipping refresh step %s: a dependency failed", name)
+                return False
+            return await self._run_script(name)
+        
+        # All tasks exist before the first one is scheduled, so dependencies can be looked up by name
+        for name in REFRESH_PIPELINE:
+            tasks[name] = asyncio.ensure_future(run(name))
+        return all(await asyncio.gather(*tasks.values()))
+    
+    def _read_stamp(self):
+        """mtime of REFRESH_STAMP, or None if no refresh has run yet"""
+        try:
+            return os.stat(os.path.join(self.data_dir, REFRESH_STAMP)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+    
+    def reload_if_stale(self):
+        """Reload the cached data if another worker has refreshed it since this one loaded"""
+        now = time.monotonic()
+        if now - self._stamp_checked_at < STALE_CHECK_SECONDS:
+            return
+        self._stamp_checked_at = now
+        if self._read_stamp() == self._loaded_stamp:
+            return
+        # One thread reloads; the others keep serving the current data meanwhile
+        if self._reload_lock.acquire(blocking=False):
+            try:
+                if self._read_stamp() != self._loaded_stamp:
+                    logger.info("Data was refreshed by another worker, reloading")
+                    self._load_locked()
+            finally:
+                self._reload_lock.release()
+    
     def refresh_data(self):
-        """Refresh data from database and recalculate forecasts"""
+        """Refresh data from database and recalculate forecasts
+        
+        Returns None without running anything if another worker's refresh is still in progress.
+        """
+        os.makedirs(self.data_dir, exist_ok=True)
+        with open(os.path.join(self.data_dir, REFRESH_LOCK), 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                logger.warning("Data refresh already in progress in another worker")
+                return None
+            return self._refresh_locked()
+    
+    def _refresh_locked(self):
+        """Run the refresh pipeline and reload; the caller holds REFRESH_LOCK"""
         try:
             logger.info("Starting data refresh...")
             
-            # Run data extraction (ABSOLUTE PATHS)
-            os.system(f"cd {self.backend_root} && python3 scripts/data_extraction.py")
-            
-            # Run forecasting (ABSOLUTE PATHS)
-            os.system(f"cd {self.backend_root} && python3 scripts/forecast.py")
-            
-            # Run enhanced forecasting (ABSOLUTE PATHS)
-            os.system(f"cd {self.backend_root} && python3 scripts/fix_transparency.py")
+            # Run extraction/forecasting scripts (ABSOLUTE PATHS)
+            success = asyncio.run(self._run_refresh_pipeline())
             
-            # Load refreshed data
+            # Tell the other workers, then load refreshed data
+            stamp_path = os.path.join(self.data_dir, REFRESH_STAMP)
+            with open(stamp_path, 'a'):
+                os.utime(stamp_path)
             self.load_cached_data()
             self.last_refresh = datetime.now()
             
-            logger.info("Data refresh completed successfully")
-            return True
+            if success:
+                logger.info("Data refresh completed successfully")
+            else:
+                logger.error("Data refresh finished with failed steps")
+            return success
             
         except Exception as e:
-            logger.error(f"Data refresh failed: {e}")
+            logger.error("Data refresh failed: %s", e)
             return False
     
     def load_cached_data(self):
         """Load processed data from CSV files (UPDATED PATHS)"""
+        with self._reload_lock:
+            self._load_locked()
+
+    def _ensure_loaded(self):
+        """Load on first use when nothing has been loaded yet (app imported without main.py)"""
+        if self._data.version == 0:
+            with self._reload_lock:
+                if self._data.version == 0:
+                    self._load_locked()
+
+    def _load_locked(self):
+        """Build a new DataSnapshot and publish it; the caller holds _reload_lock"""
         try:
-            # Load main dataset (FROM DATA FOLDER - ABSOLUTE PATH)
-            dataset_path = os.path.join(self.data_dir, "dataset_processed.csv")
-            if os.path.exists(dataset_path):
-                self.data_cache['dataset'] = pd.read_csv(dataset_path)
-                self.data_cache['dataset']['Date'] = pd.to_datetime(self.data_cache['dataset']['Date'])
-            
+            # dataset_processed.csv is not served by the API (the scripts read it
+            # directly), so it is no longer loaded eagerly here
             # (Deprecated) Skipping enhanced/predictions CSV loads; using combined_df.csv exclusively
 
-            # Load combined notebook-aligned output for fast serving
+            # Load combined notebook-aligned output for fast serving. The Parquet
+            # dataset (scripts/csv_to_parquet.py) is only opened here, memory-mapped so
+            # forked workers share the page cache; rows are read per request with the
+            # date window pushed down to the scan
+            combined_parquet = os.path.join(self.data_dir, "combined_df.parquet")
             combined_path = os.path.join(self.data_dir, "combined_df.csv")
-            if os.path.exists(combined_path):
-                self.data_cache['combined'] = pd.read_csv(combined_path)
-                self.data_cache['combined']['Date'] = pd.to_datetime(self.data_cache['combined']['Date'])
+            # Read before loading, so a refresh that lands mid-load triggers another reload
+            self._loaded_stamp = self._read_stamp()
+            data = DataSnapshot(self._data.version + 1)
+            if os.path.isdir(combined_parquet) and not is_fresh(combined_parquet, combined_path):
+                logger.warning("combined_df.parquet is older than combined_df.csv; serving the CSV until csv_to_parquet reruns")
+            elif os.path.isdir(combined_parquet):
+                try:
+                    data.combined_ds = ds.dataset(
+                        combined_parquet, format='parquet', partitioning='hive',
+                        filesystem=pafs.LocalFileSystem(use_mmap=True),
+                    )
+                    logger.info("Opened combined_df.parquet dataset (memory-mapped)")
+                except (OSError, pa.ArrowException) as e:
+                    logger.warning("Could not open combined_df.parquet, falling back to CSV: %s", e)
+            if data.combined_ds is None and os.path.exists(combined_path):
+                header = pd.read_csv(combined_path, nrows=0).columns
+                combined = pd.read_csv(
+                    combined_path,
+                    engine='pyarrow',
+                    usecols=[c for c in COMBINED_COLUMNS if c in header],
+                    dtype={c: t for c, t in COMBINED_DTYPES.items() if c in header},
+                    parse_dates=['Date'],
+                )
+                combined = combined.sort_values('Date', kind='stable').reset_index(drop=True)
+                # Held as an Arrow table: requests filter it with pyarrow.compute and
+                # convert only the selected rows back to pandas
+                data.combined = pa.Table.from_pandas(_prepare_combined(combined), preserve_index=False)
+                data.combined_index = self._index_combined(combined)
                 logger.info("Loaded combined_df.csv")
 
             # Load holidays (FROM DATA FOLDER - ABSOLUTE PATH)
@@ -148,231 +362,332 @@ class RevenueManager:
             if os.path.exists(holidays_path):
                 holidays_df = pd.read_csv(holidays_path)
                 holidays_df['Date'] = pd.to_datetime(holidays_df['Date'])
-                self.holidays_cache = holidays_df
-                logger.info(f"Loaded holidays: {len(holidays_df)} records")
+                data.holiday_dates = self._index_holidays(holidays_df)
+                data.holiday_details = self._map_holiday_details(holidays_df)
+                logger.info("Loaded holidays: %d records", len(holidays_df))
             
+            data.calendar_payloads = self._precompute_calendars(data)
+            self._data = data
             logger.info("Data loaded successfully from organized backend structure")
             
         except Exception as e:
-            logger.error(f"Failed to load cached data: {e}")
-
-    def _clean_for_json(self, data):
-        """Recursively clean data structure for JSON serialization"""
-        if isinstance(data, dict):
-            return {k: self._clean_for_json(v) for k, v in data.items()}
-        elif isinstance(data, list):
-            return [self._clean_for_json(item) for item in data]
-        elif isinstance(data, float) and (np.isnan(data) or np.isinf(data)):
-            return None
-        else:
-            return data
+            logger.error("Failed to load cached data: %s", e)
 
-    
-    def get_pricing_recommendation(self, start_date, end_date, room_type=None):
-        """Get pricing recommendations for date range"""
-        try:
-            if ('combined' not in self.data_cache or self.data_cache['combined'].empty) and ('forecast' not in self.data_cache or self.data_cache['forecast'].empty):
-                self.load_cached_data()
-            
-            # Choose data source: prefer combined_df, else previous merge logic
-            if 'combined' in self.data_cache and not self.data_cache['combined'].empty:
-                forecast_data = self.data_cache['combined'].copy()
-            else:
-                has_pred = 'predictions' in self.data_cache and not self.data_cache['predictions'].empty
-                has_fore = 'forecast' in self.data_cache and not self.data_cache['forecast'].empty
-                forecast_data = None
-                if has_pred and has_fore:
-                    preds = self.data_cache['predictions'].copy()
-                    forec = self.data_cache['forecast'].copy()
-                    preds['__source_priority'] = 0
-                    forec['__source_priority'] = 1
-                    if 'Room Type' not in forec.columns and 'room_type' in forec.columns:
-                        forec['Room Type'] = forec['room_type']
-                    combined = pd.concat([preds, forec], ignore_index=True, sort=False)
-                    combined['Date'] = pd.to_datetime(combined['Date'])
-                    combined = combined.sort_values(['Date', 'Room Type', 'Arrangement', '__source_priority'])
-                    combined = combined.drop_duplicates(subset=['Date', 'Room Type', 'Arrangement'], keep='first')
-                    forecast_data = combined.drop(columns=['__source_priority'])
-                elif has_pred:
-                    forecast_data = self.data_cache['predictions'].copy()
-                else:
-                    forecast_data = self.data_cache['forecast'].copy()
-            
-            # Filter by date range
-            start_dt = pd.to_datetime(start_date)
-            end_dt = pd.to_datetime(end_date)
-            
-            filtered_data = forecast_data[
-                (forecast_data['Date'] >= start_dt) & 
-                (forecast_data['Date'] <= end_dt)
-            ].copy()
-            
-            # Filter by room type if specified
-            if room_type and room_type != 'All':
-                filtered_data = filtered_data[filtered_data['Room Type'] == room_type]
-            
-            if filtered_data.empty:
-                return []
-            
-            # If using predictions.csv, these flags already exist; otherwise enrich from holidays
-            if self.holidays_cache is not None:
-                national_joint_holidays = set(self.holidays_cache[
-                    self.holidays_cache['Kind'].isin(['national', 'joint'])
-                ]['Date'].dt.date)
-                school_holidays = set(self.holidays_cache[
-                    self.holidays_cache['Kind'] == 'school'
-                ]['Date'].dt.date)
-                events = set(self.holidays_cache[
-                    self.holidays_cache['Kind'] == 'event'
-                ]['Date'].dt.date)
-                fasting_days = set(self.holidays_cache[
-                    self.holidays_cache['Kind'] == 'fasting'
-                ]['Date'].dt.date)
-                if 'Is_Holiday' not in filtered_data.columns:
-                    filtered_data['Is_Holiday'] = filtered_data['Date'].dt.date.isin(national_joint_holidays)
-                if 'Is_SchoolHoliday' not in filtered_data.columns:
-                    filtered_data['Is_SchoolHoliday'] = filtered_data['Date'].dt.date.isin(school_holidays)
-                if 'Is_Event' not in filtered_data.columns:
-                    filtered_data['Is_Event'] = filtered_data['Date'].dt.date.isin(events)
-                # Add fasting flag and exclude from holiday
-                filtered_data['Is_Fasting'] = filtered_data['Date'].dt.date.isin(fasting_days)
-                filtered_data.loc[filtered_data['Is_Fasting'] == True, 'Is_Holiday'] = False
-
-            # Attach holiday details map (name, kind) if available
-            holiday_details_map = {}
-            if getattr(self, 'holidays_cache', None) is not None:
-                for _, hrow in self.holidays_cache.iterrows():
-                    holiday_details_map[hrow['Date'].date()] = {
-                        'name': hrow.get('Description', ''),
-                        'kind': hrow.get('Kind', '')
-                    }
+    @staticmethod
+    def _index_holidays(holidays_df):
+        """Precompute datetime64[D] holiday dates per flag column, once per load"""
+        dates_D = holidays_df['Date'].to_numpy().astype('datetime64[D]')
+        kind = holidays_df['Kind']
+        return {
+            'Is_Holiday': np.unique(dates_D[kind.isin(['national', 'joint']).to_numpy()]),
+            'Is_SchoolHoliday': np.unique(dates_D[(kind == 'school').to_numpy()]),
+            'Is_Event': np.unique(dates_D[(kind == 'event').to_numpy()]),
+            'Is_Fasting': np.unique(dates_D[(kind == 'fasting').to_numpy()]),
+        }
 
-            
-            # Coerce ARR
-            if 'Average Room Rate' in filtered_data.columns:
-                filtered_data['Average Room Rate'] = pd.to_numeric(filtered_data['Average Room Rate'], errors='coerce')
-            
-            # Robust occupancy derivation into __occ
-            filtered_data['__occ'] = np.nan
-            if 'Occupancy Rate' in filtered_data.columns:
-                if filtered_data['Occupancy Rate'].dtype == object:
-                    def _parse_occ_str(x):
-                        try:
-                            s = str(x).strip()
-                            if s.endswith('%'):
-                                return float(s.replace('%',''))/100.0
-                            val = float(s)
-                            return val/100.0 if val > 1.0 else val
-                        except Exception:
-                            return np.nan
-                    filtered_data['__occ'] = filtered_data['Occupancy Rate'].apply(_parse_occ_str)
-                else:
-                    # Numeric occupancy; normalize if >1 (assume percentage)
-                    occ_num = pd.to_numeric(filtered_data['Occupancy Rate'], errors='coerce')
-                    filtered_data['__occ'] = occ_num.where(occ_num <= 1.0, occ_num/100.0)
-
-            # Fill from alternate columns if still NaN
-            if '__occ' in filtered_data.columns and '__occ' in filtered_data:
-                if 'Occ' in filtered_data.columns:
-                    alt = pd.to_numeric(filtered_data['Occ'], errors='coerce')
-                    filtered_data['__occ'] = filtered_data['__occ'].fillna(alt)
-                if 'Predicted_Occupancy' in filtered_data.columns:
-                    alt2 = pd.to_numeric(filtered_data['Predicted_Occupancy'], errors='coerce')
-                    filtered_data['__occ'] = filtered_data['__occ'].fillna(alt2)
-
-            # Ensure minimal derived fields if not present (predictions.csv already includes numeric day fields)
-            if 'Day_of_Week' not in filtered_data.columns:
-                filtered_data['Day_of_Week'] = filtered_data['Date'].dt.day_name()
-            if 'Is_Weekend' not in filtered_data.columns:
-                filtered_data['Is_Weekend'] = filtered_data['Date'].dt.weekday.isin([5, 6])
-            
-            # Calculate recommendations
-            recommendations = []
-            
-            for _, row in filtered_data.iterrows():
-                # Use values directly from selected source (combined_df preferred)
-                recommended_arr = row.get('Average Room Rate', np.nan)
-                occ_val = row.get('__occ', np.nan)
-                if pd.isna(occ_val):
-                    occ_val = row.get('Occ', np.nan)
-                recommended_arr = max(0, float(recommended_arr) if not pd.isna(recommended_arr) else 0)
-                recommended_occ = max(0, min(1, float(occ_val) if not pd.isna(occ_val) else 0))
-                
-                recommendation = {
-                    'date': row['Date'].strftime('%Y-%m-%d'),
-                    'room_type': str(row['Room Type']),
-                    'arrangement': str(row.get('Arrangement')) if 'Arrangement' in row.index and not pd.isna(row.get('Arrangement')) else None,
-                    'recommended_arr': float(recommended_arr) if not pd.isna(recommended_arr) else 0.0,
-                    'recommended_occupancy': float(recommended_occ) if not pd.isna(recommended_occ) else 0.0,
-                    'is_holiday': bool(row['Is_Holiday']) if not pd.isna(row['Is_Holiday']) else False,
-                    'is_school_holiday': bool(row.get('Is_SchoolHoliday', False)) if not pd.isna(row.get('Is_SchoolHoliday', False)) else False,
-                    'is_event': bool(row.get('Is_Event', False)) if not pd.isna(row.get('Is_Event', False)) else False,
-                    'is_weekend': bool(row['Is_Weekend']) if not pd.isna(row['Is_Weekend']) else False,
-                    'day_of_week': str(row['Day_of_Week']) if not pd.isna(row['Day_of_Week']) else 'Unknown',
-                    'is_fasting': bool(row.get('Is_Fasting', False)) if not pd.isna(row.get('Is_Fasting', False)) else False,
-                    # Transparent driver fields when available
-                    'is_bridge': bool(row.get('Is_Bridge', False)),
-                    'holiday_duration': int(row.get('Holiday_Duration', 0)) if not pd.isna(row.get('Holiday_Duration', 0)) else 0,
-                    'days_of_holiday': int(row.get('Days_of_Holiday', 0)) if not pd.isna(row.get('Days_of_Holiday', 0)) else 0,
-                    'distance_to_holiday': int(row.get('Distance_to_Holiday', 0)) if not pd.isna(row.get('Distance_to_Holiday', 0)) else 0,
-                    'holiday_details': holiday_details_map.get(row['Date'].date()) if hasattr(row['Date'], 'date') else None,
-                }
-                
-                recommendations.append(recommendation)
-            
-            # Clean recommendations for JSON
-            cleaned_recommendations = self._clean_for_json(recommendations)
-            return cleaned_recommendations
-            
+    @staticmethod
+    def _index_combined(combined):
+        """Sorted Date values, overall and per room type (with their row positions), for searchsorted windows"""
+        dates = combined['Date'].to_numpy()
+        rooms = {
+            str(room): (rows, dates[rows])
+            for room, rows in combined.groupby('Room Type', observed=True).indices.items()
+        }
+        return dates, rooms
+
+    @staticmethod
+    def _map_holiday_details(holidays_df):
+        """Index {'name', 'kind'} details by sorted datetime64[D] holiday date, once per load (later rows win)"""
+        blank = [''] * len(holidays_df)
+        names = holidays_df['Description'] if 'Description' in holidays_df.columns else blank
+        kinds = holidays_df['Kind'] if 'Kind' in holidays_df.columns else blank
+        dates_D = holidays_df['Date'].to_numpy().astype('datetime64[D]')
+        details = {d: {'name': name, 'kind': kind} for d, name, kind in zip(dates_D, names, kinds)}
+        keys = np.array(sorted(details), dtype='datetime64[D]')
+        values = np.empty(len(keys), dtype=object)
+        values[:] = [details[k] for k in keys]
+        return keys, values
+
+    @staticmethod
+    def _lookup_holiday_details(holiday_details, dates_D):
+        """Holiday details per datetime64[D] date (None where there is no holiday)"""
+        found = np.full(len(dates_D), None, dtype=object)
+        if holiday_details is None or not len(holiday_details[0]):
+            return found
+        keys, values = holiday_details
+        idx = np.searchsorted(keys, dates_D).clip(max=len(keys) - 1)
+        hit = keys[idx] == dates_D
+        found[hit] = values[idx[hit]]
+        return found
+
+    @staticmethod
+    def _scan_combined(combined_ds, start_dt, end_dt, room_type=None):
+        """Read one date window (and room type) from the Parquet dataset"""
+        date_filter = (
+            (pc.field('Year') >= start_dt.year) & (pc.field('Year') <= end_dt.year) &
+            (pc.field('Date') >= start_dt.to_pydatetime()) & (pc.field('Date') <= end_dt.to_pydatetime())
+        )
+        if room_type and room_type != 'All':
+            date_filter = date_filter & (pc.field('Room Type') == room_type)
+        columns = [c for c in COMBINED_COLUMNS if c in combined_ds.schema.names]
+        window = combined_ds.to_table(filter=date_filter, columns=columns).to_pandas()
+        window = window.astype({c: t for c, t in COMBINED_DTYPES.items() if c in window.columns})
+        window = window.sort_values('Date', kind='stable').reset_index(drop=True)
+        return _prepare_combined(window)
+
+    @staticmethod
+    def _slice_combined(table, combined_index, start_dt, end_dt, room_type=None):
+        """Select one date window (and room type) from the in-memory Arrow table"""
+        dates, rooms = combined_index
+        lo_key, hi_key = start_dt.to_datetime64(), end_dt.to_datetime64()
+        if room_type and room_type != 'All':
+            if room_type not in rooms:
+                return table.slice(0, 0).to_pandas()
+            rows, room_dates = rooms[room_type]
+            lo = np.searchsorted(room_dates, lo_key, side='left')
+            hi = np.searchsorted(room_dates, hi_key, side='right')
+            return table.take(rows[lo:hi]).to_pandas()
+        # Rows are sorted by Date, so the window is a contiguous zero-copy slice
+        lo = np.searchsorted(dates, lo_key, side='left')
+        hi = np.searchsorted(dates, hi_key, side='right')
+        return table.slice(lo, hi - lo).to_pandas()
+
+    def get_pricing_recommendation(self, start_date, end_date, room_type=None, data=None):
+        """Get pricing recommendations for date range (from the current snapshot unless one is given)"""
+        try:
+            return self.compute_pricing_recommendation(start_date, end_date, room_type, data)
         except Exception as e:
-            logger.error(f"Failed to get pricing recommendations: {e}")
+            logger.error("Failed to get pricing recommendations: %s", e)
             return []
     
+    def compute_pricing_recommendation(self, start_date, end_date, room_type=None, data=None):
+        """Same as get_pricing_recommendation, but raises instead of returning [] on failure"""
+        if data is None:
+            self._ensure_loaded()
+            data = self._data
+        
+        start_dt = pd.to_datetime(start_date)
+        end_dt = pd.to_datetime(end_date)
+
+        # Filter by date range (and room type if specified)
+        if data.combined_ds is not None:
+            filtered_data = self._scan_combined(data.combined_ds, start_dt, end_dt, room_type)
+        elif data.combined is not None:
+            filtered_data = self._slice_combined(data.combined, data.combined_index, start_dt, end_dt, room_type)
+        else:
+            return []
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Recommendations %s..%s (%s): %d rows", start_date, end_date, room_type or 'All', len(filtered_data))
+        
+        if filtered_data.empty:
+            return []
+        
+        dates_D = filtered_data['Date'].to_numpy().astype('datetime64[D]')
+
+        # If using predictions.csv, these flags already exist; otherwise enrich from holidays
+        if data.holiday_dates is not None:
+            for col in ('Is_Holiday', 'Is_SchoolHoliday', 'Is_Event'):
+                if col not in filtered_data.columns:
+                    filtered_data[col] = np.isin(dates_D, data.holiday_dates[col])
+            # Add fasting flag (excluded from holiday in _derive_pricing)
+            filtered_data['Is_Fasting'] = np.isin(dates_D, data.holiday_dates['Is_Fasting'])
+
+
+        # Ensure minimal derived fields if not present (predictions.csv already includes numeric day fields)
+        if 'Day_of_Week' not in filtered_data.columns:
+            filtered_data['Day_of_Week'] = filtered_data['Date'].dt.day_name()
+        if 'Is_Weekend' not in filtered_data.columns:
+            filtered_data['Is_Weekend'] = filtered_data['Date'].dt.weekday.isin([5, 6])
+
+        # Calculate recommendations column-wise, then materialize records once
+        def _flag(col):
+            if col not in filtered_data.columns:
+                return np.zeros(len(filtered_data), dtype=bool)
+            s = filtered_data[col]
+            return (s.notna() & s.fillna(False).astype(bool)).to_numpy()
+
+        def _count(col):
+            if col not in filtered_data.columns:
+                return np.zeros(len(filtered_data), dtype=int)
+            return pd.to_numeric(filtered_data[col], errors='coerce').fillna(0).astype(int).to_numpy()
+
+        if 'Average Room Rate' in filtered_data.columns:
+            arr = filtered_data['Average Room Rate'].to_numpy(dtype=float, na_value=np.nan)
+        else:
+            arr = np.full(len(filtered_data), np.nan)
+        occ = filtered_data['__occ'].to_numpy(dtype=float, na_value=np.nan)
+        is_fasting = _flag('Is_Fasting')
+        arr, occ, is_holiday = _derive_pricing(arr, occ, _flag('Is_Holiday'), is_fasting)
+        if 'Arrangement' in filtered_data.columns:
+            arrangement = filtered_data['Arrangement']
+            arrangement = arrangement.astype(str).where(arrangement.notna(), None)
+        else:
+            arrangement = None
+        day_of_week = filtered_data['Day_of_Week']
+
+        out = pd.DataFrame({
+            'date': filtered_data['Date'].dt.strftime('%Y-%m-%d'),
+            'room_type': filtered_data['Room Type'].astype(str),
+            'arrangement': arrangement,
+            # Use values directly from selected source (combined_df preferred)
+            'recommended_arr': arr,
+            'recommended_occupancy': occ,
+            'is_holiday': is_holiday,
+            'is_school_holiday': _flag('Is_SchoolHoliday'),
+            'is_event': _flag('Is_Event'),
+            'is_weekend': _flag('Is_Weekend'),
+            'day_of_week': day_of_week.astype(str).where(day_of_week.notna(), 'Unknown'),
+            'is_fasting': is_fasting,
+            # Transparent driver fields when available
+            'is_bridge': _flag('Is_Bridge'),
+            'holiday_duration': _count('Holiday_Duration'),
+            'days_of_holiday': _count('Days_of_Holiday'),
+            'distance_to_holiday': _count('Distance_to_Holiday'),
+            'holiday_details': self._lookup_holiday_details(data.holiday_details, dates_D),
+        })
+
+        return out.to_dict(orient='records')
+    
     # Removed obsolete helper methods (confidence/considerations/holiday category)
     
-    def get_calendar_data(self, year, month):
-        """Get calendar data for a specific month"""
+    @staticmethod
+    def _months_covered(data):
+        """(year, month) pairs spanned by the combined data"""
+        if data.combined_ds is not None:
+            dates = data.combined_ds.to_table(columns=['Date'])['Date']
+        elif data.combined is not None:
+            dates = data.combined['Date']
+        else:
+            return []
+        bounds = pc.min_max(dates)
+        if not bounds['min'].is_valid:
+            return []
+        months = pd.period_range(bounds['min'].as_py(), bounds['max'].as_py(), freq='M')
+        return [(p.year, p.month) for p in months]
+    
+    def _precompute_calendars(self, data):
+        """Encode every covered month's calendar of a new snapshot, so requests only look up bytes"""
+        payloads = {}
+        for year, month in self._months_covered(data):
+            try:
+                payloads[(year, month)] = b''.join(_stream_calendar(self.compute_calendar_data(year, month, data)))
+            except Exception as e:
+                # Left out, so requests for this month compute it (and retry) on demand
+                logger.error("Failed to precompute calendar %d-%02d: %s", year, month, e)
+        logger.info("Precomputed calendar payloads: %d months", len(payloads))
+        return payloads
+    
+    def iter_calendar_data(self, year, month, data=None):
+        """Get calendar data for a specific month as (date, recommendations) pairs in date order"""
         try:
-            # Create date range for the month
-            start_date = datetime(year, month, 1)
-            if month == 12:
-                end_date = datetime(year + 1, 1, 1) - timedelta(days=1)
-            else:
-                end_date = datetime(year, month + 1, 1) - timedelta(days=1)
-            
-            # Get recommendations for the month
-            recommendations = self.get_pricing_recommendation(
-                start_date.strftime('%Y-%m-%d'),
-                end_date.strftime('%Y-%m-%d')
-            )
-            
-            # Organize by date
-            calendar_data = {}
-            for rec in recommendations:
-                date_str = rec['date']
-                if date_str not in calendar_data:
-                    calendar_data[date_str] = []
-                calendar_data[date_str].append(rec)
-            
-            # Clean calendar data for JSON serialization
-            cleaned_calendar_data = self._clean_for_json(calendar_data)
-            return cleaned_calendar_data
-            
+            return self.compute_calendar_data(year, month, data)
         except Exception as e:
-            logger.error(f"Failed to get calendar data: {e}")
-            return {}
+            logger.error("Failed to get calendar data: %s", e)
+            return []
+
+    def compute_calendar_data(self, year, month, data=None):
+        """Same as iter_calendar_data, but raises instead of returning no days on failure"""
+        # Create date range for the month
+        start_date = datetime(year, month, 1)
+        if month == 12:
+            end_date = datetime(year + 1, 1, 1) - timedelta(days=1)
+        else:
+            end_date = datetime(year, month + 1, 1) - timedelta(days=1)
+        
+        # Get recommendations for the month
+        recommendations = self.compute_pricing_recommendation(
+            start_date.strftime('%Y-%m-%d'),
+            end_date.strftime('%Y-%m-%d'),
+            data=data,
+        )
+
+        # Recommendations are sorted by date, so each group is a whole day
+        return [(date_str, list(recs)) for date_str, recs in groupby(recommendations, key=itemgetter('date'))]
+
+    def get_calendar_data(self, year, month):
+        """Get calendar data for a specific month"""
+        return dict(self.iter_calendar_data(year, month))
 
 # Initialize revenue manager
 revenue_manager = RevenueManager()
 
+RECORDS_PER_CHUNK = 256
+
+def _stream_calendar(cal_iter):
+    """Yield a {date: [recommendations]} JSON object one day at a time"""
+    yield b'{'
+    first = True
+    for date_str, recs in cal_iter:
+        if not first:
+            yield b','
+        first = False
+        yield _dumps(date_str) + b':' + _dumps(recs)
+    yield b'}'
+
+def _encode_records(recommendations):
+    """orjson-encode records as comma-joinable chunks of RECORDS_PER_CHUNK"""
+    return tuple(
+        _dumps(recommendations[i:i + RECORDS_PER_CHUNK])[1:-1]
+        for i in range(0, len(recommendations), RECORDS_PER_CHUNK)
+    )
+
+def _stream_recommendations(rec_chunks, meta):
+    """Yield {"recommendations": [...], **meta} JSON from pre-encoded record chunks"""
+    yield b'{"recommendations":['
+    for i, chunk in enumerate(rec_chunks):
+        if i:
+            yield b','
+        yield chunk
+    yield b'],' + _dumps(meta)[1:]
+
+def _pack_recommendations(packed_records, meta):
+    """Assemble the {"recommendations": [...], **meta} msgpack map around pre-packed records"""
+    packer = msgpack.Packer(use_bin_type=True)
+    parts = [packer.pack_map_header(1 + len(meta)), packer.pack('recommendations'), packed_records]
+    for key, value in meta.items():
+        parts.append(packer.pack(key))
+        parts.append(packer.pack(value))
+    return b''.join(parts)
+
+def _wants_msgpack():
+    return MSGPACK_MIMETYPE in request.headers.get('Accept', '')
+
+# Encoded responses are memoized per data_version, so a reload never serves stale data.
+# They call the raising compute_* methods: lru_cache does not store a call that raised,
+# so a failure is answered empty once and retried on the next request
+@lru_cache(maxsize=512)
+def _cached_recommendations(start_date, end_date, room_type, data_version):
+    recommendations = revenue_manager.compute_pricing_recommendation(start_date, end_date, room_type)
+    return len(recommendations), _encode_records(recommendations)
+
+@lru_cache(maxsize=512)
+def _cached_calendar(year, month, data_version):
+    return tuple(_stream_calendar(revenue_manager.compute_calendar_data(year, month)))
+
+@lru_cache(maxsize=128)
+def _cached_recommendations_msgpack(start_date, end_date, room_type, data_version):
+    recommendations = revenue_manager.compute_pricing_recommendation(start_date, end_date, room_type)
+    return len(recommendations), _packb(recommendations)
+
+@lru_cache(maxsize=128)
+def _cached_calendar_msgpack(year, month, data_version):
+    return _packb(dict(revenue_manager.compute_calendar_data(year, month)))
+
 @app.route('/')
 def index():
     return jsonify({"message": "Revenue Management API", "status": "running", "structure": "organized_backend"})
 
+@app.before_request
+def _reload_if_stale():
+    revenue_manager.reload_if_stale()
+
 @app.route('/api/refresh', methods=['POST'])
 def refresh_data():
     """Refresh data from database"""
     success = revenue_manager.refresh_data()
+    if success is None:
+        return jsonify({'success': False, 'message': 'Data refresh already in progress'}), 409
     return jsonify({
         'success': success,
         'message': 'Data refreshed successfully' if success else 'Data refresh failed'
@@ -388,21 +703,42 @@ def get_recommendations():
     if not start_date or not end_date:
         return jsonify({'error': 'start_date and end_date are required'}), 400
     
-    recommendations = revenue_manager.get_pricing_recommendation(start_date, end_date, room_type)
+    as_msgpack = _wants_msgpack()
+    try:
+        if as_msgpack:
+            count, packed_records = _cached_recommendations_msgpack(start_date, end_date, room_type, revenue_manager.data_version)
+        else:
+            count, rec_chunks = _cached_recommendations(start_date, end_date, room_type, revenue_manager.data_version)
+    except Exception as e:
+        logger.error("Failed to get pricing recommendations: %s", e)
+        count, packed_records, rec_chunks = 0, _packb([]), ()
     
-    return jsonify({
-        'recommendations': recommendations,
-        'count': len(recommendations),
+    meta = {
+        'count': count,
         'date_range': f"{start_date} to {end_date}",
         'room_type': room_type
-    })
+    }
+    if as_msgpack:
+        return Response(_pack_recommendations(packed_records, meta), mimetype=MSGPACK_MIMETYPE)
+    return Response(stream_with_context(_stream_recommendations(rec_chunks, meta)), mimetype='application/json')
 
 @app.route('/api/calendar/<int:year>/<int:month>')
 @login_required
 def get_calendar(year, month):
     """Get calendar data for specific month"""
-    calendar_data = revenue_manager.get_calendar_data(year, month)
-    return jsonify(calendar_data)
+    as_msgpack = _wants_msgpack()
+    try:
+        if as_msgpack:
+            return Response(_cached_calendar_msgpack(year, month, revenue_manager.data_version), mimetype=MSGPACK_MIMETYPE)
+        payload = revenue_manager.calendar_payloads.get((year, month))
+        if payload is not None:
+            return Response(payload, mimetype='application/json')
+        return Response(_cached_calendar(year, month, revenue_manager.data_version), mimetype='application/json')
+    except Exception as e:
+        logger.error("Failed to get calendar data: %s", e)
+        if as_msgpack:
+            return Response(_packb({}), mimetype=MSGPACK_MIMETYPE)
+        return Response(b'{}', mimetype='application/json')
 
 # Authentication routes
 @app.route('/api/auth/login', methods=['POST'])
@@ -444,7 +780,7 @@ def login():
         return response
         
     except Exception as e:
-        logger.error(f"Login error: {e}")
+        logger.error("Login error: %s", e)
         return jsonify({'error': 'Login failed'}), 500
 
 @app.route('/api/auth/logout', methods=['POST'])
@@ -479,4 +815,4 @@ if __name__ == "__main__":
     port = int(os.getenv('PORT', 5001))
     print(f"API available at: http://localhost:{port}")
     print("=" * 60)
-    app.run(host="0.0.0.0", port=port, debug=True)
+    app.run(host="0.0.0.0", port=port, debug=os.getenv('FLASK_ENV') == 'dev')
@@ -5,16 +5,17 @@ Uses JWT tokens with hardcoded users for simplicity
 """
 
 import jwt
-import hashlib
+import bcrypt
 from datetime import datetime, timedelta
-from functools import wraps
+from functools import lru_cache, wraps
 from flask import request, jsonify, current_app
 import os
+import time
 
 # Hardcoded users (in production, use environment variables)
 USERS = {
     "salma": {
-        "password": "justinkeren",  # In production, use hashed passwords
+        "password": "justinkeren",  # Hashed at import below; only pw_hash is kept
         "role": "Sales Executive",
         "name": "Salma"
     },
@@ -30,18 +31,34 @@ USERS = {
     }
 }
 
+# Replace plaintext passwords with bcrypt hashes once at import
+for _user in USERS.values():
+    _user['pw_hash'] = bcrypt.hashpw(_user.pop('password').encode(), bcrypt.gensalt(12))
+
+# Checked against unknown usernames so both branches pay the same bcrypt cost
+_DUMMY_PW_HASH = bcrypt.hashpw(b'', bcrypt.gensalt(12))
+
 # JWT Secret (in production, use environment variable)
 JWT_SECRET = os.getenv('JWT_SECRET', 'revenue_management_jwt_secret_key_2024')
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 200
 
+# bcrypt only hashes the first 72 bytes, and bcrypt>=5 raises on longer input
+BCRYPT_MAX_PASSWORD_BYTES = 72
+
+def _is_checkable_password(password) -> bool:
+    """True if password can be passed to bcrypt (a str of at most 72 UTF-8 bytes)"""
+    return isinstance(password, str) and len(password.encode()) <= BCRYPT_MAX_PASSWORD_BYTES
+
 def hash_password(password: str) -> str:
-    """Simple password hashing (use bcrypt in production)"""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Hash a password with bcrypt (cost 12, random salt), same scheme as the USERS hashes"""
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(12)).decode()
 
 def verify_password(password: str, hashed: str) -> bool:
-    """Verify password against hash"""
-    return hash_password(password) == hashed
+    """Verify password against a bcrypt hash (constant-time compare)"""
+    if not _is_checkable_password(password):
+        return False
+    return bcrypt.checkpw(password.encode(), hashed.encode())
 
 def generate_token(user_id: str, user_data: dict) -> str:
     """Generate JWT token for user"""
@@ -54,23 +71,34 @@ def generate_token(user_id: str, user_data: dict) -> str:
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
+@lru_cache(maxsize=4096)
+def _decode_cached(token: str) -> dict:
+    """Decode a JWT once; repeat requests with the same token skip the HMAC and claim parsing"""
+    return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+
 def verify_token(token: str) -> dict:
     """Verify and decode JWT token"""
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return payload
+        payload = _decode_cached(token)
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
+    
+    # A cached payload was valid when first decoded, so expiry is rechecked on every hit
+    if payload['exp'] < time.time():
+        return None
+    return dict(payload)
 
 def authenticate_user(username: str, password: str) -> dict:
     """Authenticate user with username/password"""
-    if username not in USERS:
+    # No stored password is longer than 72 bytes or a non-string, so these can never match
+    if not _is_checkable_password(password):
         return None
-    
-    user = USERS[username]
-    if user['password'] == password:  # Simple comparison for demo
+    user = USERS.get(username)
+    pw_hash = user['pw_hash'] if user else _DUMMY_PW_HASH
+    # bcrypt.checkpw compares in constant time
+    if bcrypt.checkpw(password.encode(), pw_hash) and user:
         return {
             'user_id': username,
             'name': user['name'],
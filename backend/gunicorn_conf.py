@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+Gunicorn configuration for the Revenue Management backend
+Usage (from backend/): gunicorn -c gunicorn_conf.py main:app
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5001)}"
+
+# One process per CPU, each serving requests on a small thread pool
+workers = int(os.getenv('WEB_CONCURRENCY', os.cpu_count() or 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+# Import main.py (and its cached data) once in the master, then fork workers
+# so they share the loaded pages copy-on-write. After POST /api/refresh in one
+# worker, the others notice data/.refresh_stamp and reload on their next request
+preload_app = True
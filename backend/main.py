@@ -2,28 +2,36 @@
 """
 Revenue Management Backend - Main Entry Point
 Start the Flask API server from the organized backend structure
+
+Production: gunicorn -c gunicorn_conf.py main:app
+Development: FLASK_ENV=dev python main.py
 """
 
 import sys
 import os
 from pathlib import Path
+from dotenv import load_dotenv
 
 # Add backend to Python path
 backend_path = Path(__file__).parent
 sys.path.insert(0, str(backend_path))
 
+load_dotenv()
+
 # Import the Flask app
-from app.revenue_management_app import app
+from app.revenue_management_app import app, revenue_manager
+
+# Load cached data at import so gunicorn's preload populates it once for all workers
+revenue_manager.load_cached_data()
 
 if __name__ == "__main__":
-    import os
-    from dotenv import load_dotenv
-    
-    load_dotenv()
+    debug = os.getenv('FLASK_ENV') == 'dev'
     
     print("=== STARTING REVENUE MANAGEMENT BACKEND ===")
     print("Backend structure: ORGANIZED ✅")
+    if not debug:
+        print("Single-process server; use `gunicorn -c gunicorn_conf.py main:app` in production")
     print("=" * 50)
     
     port = int(os.getenv('PORT', 5001))
-    app.run(host="0.0.0.0", port=port, debug=True)
+    app.run(host="0.0.0.0", port=port, debug=debug)
@@ -1,33 +1,110 @@
+import os
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use("Agg")  # Batch script: render straight to PNG, no GUI backend
 import matplotlib.pyplot as plt
-import seaborn as sns
-from scipy import stats
 import warnings
+from concurrent.futures import ThreadPoolExecutor
+from csv_to_parquet import is_fresh
 warnings.filterwarnings('ignore')
 
+PROCESSED_CSV = "data/dataset_processed.csv"
+PROCESSED_PARQUET = "data/dataset_processed.parquet"
+
+def pearson_fast(x, y):
+    """Pearson correlation of two float64 arrays as a single dot of mean-centered vectors"""
+    xc = x - x.mean()
+    yc = y - y.mean()
+    return xc @ yc / (np.linalg.norm(xc) * np.linalg.norm(yc))
+
+def fast_linreg(x, y):
+    """Closed-form OLS of y on x: (slope, intercept, r) without linregress' p-value/stderr work"""
+    xm = x.mean()
+    ym = y.mean()
+    dx = x - xm
+    dy = y - ym
+    vx = dx @ dx
+    sxy = dx @ dy
+    slope = sxy / vx
+    intercept = ym - slope * xm
+    r = sxy / np.sqrt(vx * (dy @ dy))
+    return slope, intercept, r
+
+def polyfit2(x, y):
+    """Quadratic least-squares fit via the 3x3 normal equations; returns [a, b, c] for a*x^2 + b*x + c"""
+    x2 = x * x
+    s0 = len(x)
+    s1 = x.sum()
+    s2 = x2.sum()
+    s3 = (x2 * x).sum()
+    s4 = (x2 * x2).sum()
+    A = np.array([[s4, s3, s2], [s3, s2, s1], [s2, s1, s0]])
+    b = np.array([(x2 * y).sum(), (x * y).sum(), y.sum()])
+    return np.linalg.solve(A, b)
+
+def exp_fit(x, y):
+    """Fit y = a * exp(b * x) by least squares on log(y); returns (a, b, R² of the fit on the original scale)"""
+    b, intercept, _ = fast_linreg(x, np.log(y))
+    residual = y - np.exp(b * x + intercept)
+    centered = y - y.mean()
+    r_squared = 1.0 - (residual @ residual) / (centered @ centered)
+    return np.exp(intercept), b, r_squared
+
+def compute_room_stats(x, y, is_holiday):
+    """Correlations and trendline fits for one room type's arrays (no matplotlib, safe in a worker thread)"""
+    is_weekday = ~is_holiday
+    stats = {
+        "overall_corr": pearson_fast(x, y),
+        "holiday_corr": pearson_fast(x[is_holiday], y[is_holiday]) if is_holiday.sum() > 1 else np.nan,
+        "weekday_corr": pearson_fast(x[is_weekday], y[is_weekday]) if is_weekday.sum() > 1 else np.nan,
+        "linear": None,
+        "poly": None,
+        "exp": None,
+    }
+    if len(x) > 1:
+        stats["linear"] = fast_linreg(x, y)[:2]
+        try:
+            stats["poly"] = polyfit2(x, y)
+        except np.linalg.LinAlgError:
+            pass
+    if len(x) > 10:
+        stats["exp"] = exp_fit(x, y)
+    return stats
+
+def eval_polynomial(coeffs, x):
+    """Evaluate highest-degree-first coefficients at x with Horner's method"""
+    result = np.zeros_like(x)
+    for c in coeffs:
+        result = result * x + c
+    return result
+
 def analyze_arr_occupancy_relationship():
     """Analyze ARR vs Occupancy relationship per room type with trendlines"""
     
     print("=== ARR vs OCCUPANCY RELATIONSHIP ANALYSIS ===")
     
     # Load dataset
-    df = pd.read_csv("data/dataset_processed.csv")
-    df["Date"] = pd.to_datetime(df["Date"])
-    
-    # Get daily occupancy (hotel-level)
-    daily_occ = df.groupby("Date").agg({
-        "Occupancy Rate": "first",
-        "Is_Holiday": "first",
-        "Is_Weekend": "first"
-    }).reset_index()
-    
-    # Merge with room data
-    df_with_occ = df.merge(daily_occ[["Date", "Occupancy Rate"]], on="Date", how="left", suffixes=("", "_daily"))
-    df_with_occ = df_with_occ.rename(columns={"Occupancy Rate_daily": "Overall_Occupancy"})
+    columns = ["Date", "Room Type", "Average Room Rate", "Occupancy Rate", "Is_Holiday", "Is_Weekend"]
+    dtypes = {
+        "Room Type": "category",
+        "Average Room Rate": "float32",
+        "Occupancy Rate": "float32",
+        "Is_Holiday": "bool",
+        "Is_Weekend": "bool",
+    }
+    if is_fresh(PROCESSED_PARQUET, PROCESSED_CSV):
+        df = pd.read_parquet(PROCESSED_PARQUET, columns=columns).astype(dtypes)
+    else:
+        df = pd.read_csv(PROCESSED_CSV, usecols=columns, dtype=dtypes, parse_dates=["Date"], engine="c")
+    
+    # Get daily occupancy (hotel-level) and look it up per row by Date
+    occ_by_date = df.groupby("Date")["Occupancy Rate"].first()
+    df_with_occ = df
+    df_with_occ["Overall_Occupancy"] = df_with_occ["Date"].map(occ_by_date)
     
     # Create holiday/weekday flag
-    df_with_occ["Is_Holiday_Weekend"] = df_with_occ["Is_Holiday"] | df_with_occ["Is_Weekend"]
+    is_holiday_weekend = np.logical_or(df_with_occ["Is_Holiday"].to_numpy(bool), df_with_occ["Is_Weekend"].to_numpy(bool))
     
     # Room types
     room_types = ["Deluxe", "Executive Suite", "Suite", "Family Suite"]
@@ -42,67 +119,73 @@ def analyze_arr_occupancy_relationship():
     # Store correlation results
     correlation_results = []
     
+    # Complete rows as numpy arrays; each room type is a boolean mask over its category code,
+    # so no per-room frames are copied
+    valid = df_with_occ[["Average Room Rate", "Overall_Occupancy"]].notna().all(axis=1).to_numpy()
+    room_codes = df_with_occ["Room Type"].cat.codes.to_numpy()
+    categories = df_with_occ["Room Type"].cat.categories
+    occ_all = df_with_occ["Overall_Occupancy"].to_numpy(np.float64)
+    arr_all = df_with_occ["Average Room Rate"].to_numpy(np.float64)
+    hw_all = is_holiday_weekend
+    room_masks = {
+        room_type: valid & (room_codes == categories.get_loc(room_type)) if room_type in categories else np.zeros_like(valid)
+        for room_type in room_types
+    }
+    
+    # Per-room statistics are pure numpy, so they run in worker threads; plotting stays on this thread
+    room_arrays = {
+        room_type: (occ_all[mask], arr_all[mask], hw_all[mask])
+        for room_type, mask in room_masks.items() if mask.any()
+    }
+    with ThreadPoolExecutor(max_workers=len(room_types)) as pool:
+        room_stats = dict(zip(room_arrays, pool.map(lambda arrays: compute_room_stats(*arrays), room_arrays.values())))
+    
     for i, room_type in enumerate(room_types):
         ax = axes[i]
         
-        # Filter data for this room type
-        room_data = df_with_occ[df_with_occ["Room Type"] == room_type].copy()
-        
-        # Remove rows with missing data
-        room_data = room_data.dropna(subset=["Average Room Rate", "Overall_Occupancy"])
-        
-        if len(room_data) == 0:
+        if room_type not in room_arrays:
             ax.text(0.5, 0.5, f'No data for {room_type}', ha='center', va='center', transform=ax.transAxes)
             continue
         
         # Separate holiday and weekday data
-        holiday_data = room_data[room_data["Is_Holiday_Weekend"] == True]
-        weekday_data = room_data[room_data["Is_Holiday_Weekend"] == False]
+        x, y, is_holiday = room_arrays[room_type]
+        is_weekday = ~is_holiday
+        stats = room_stats[room_type]
+        overall_corr = stats["overall_corr"]
         
         # Plot data points
-        if len(weekday_data) > 0:
-            ax.scatter(weekday_data["Overall_Occupancy"], weekday_data["Average Room Rate"]/1e6, 
-                      alpha=0.6, s=20, color=colors[i], marker='x', label=f'{room_type} Weekday')
+        if is_weekday.any():
+            ax.scatter(x[is_weekday], y[is_weekday]/1e6, 
+                      alpha=0.6, s=20, color=colors[i], marker='x', label=f'{room_type} Weekday',
+                      rasterized=True)
         
-        if len(holiday_data) > 0:
-            ax.scatter(holiday_data["Overall_Occupancy"], holiday_data["Average Room Rate"]/1e6, 
-                      alpha=0.8, s=30, color=colors[i], marker='o', label=f'{room_type} Holiday')
-        
-        # Calculate correlations
-        overall_corr, _ = stats.pearsonr(room_data["Overall_Occupancy"], room_data["Average Room Rate"])
-        holiday_corr, _ = stats.pearsonr(holiday_data["Overall_Occupancy"], holiday_data["Average Room Rate"]) if len(holiday_data) > 1 else (np.nan, np.nan)
-        weekday_corr, _ = stats.pearsonr(weekday_data["Overall_Occupancy"], weekday_data["Average Room Rate"]) if len(weekday_data) > 1 else (np.nan, np.nan)
+        if is_holiday.any():
+            ax.scatter(x[is_holiday], y[is_holiday]/1e6, 
+                      alpha=0.8, s=30, color=colors[i], marker='o', label=f'{room_type} Holiday',
+                      rasterized=True)
         
         # Store results
         correlation_results.append({
             "Room Type": room_type,
             "Overall Correlation": overall_corr,
-            "Holiday Correlation": holiday_corr,
-            "Weekday Correlation": weekday_corr,
-            "Data Points": len(room_data),
-            "Holiday Points": len(holiday_data),
-            "Weekday Points": len(weekday_data)
+            "Holiday Correlation": stats["holiday_corr"],
+            "Weekday Correlation": stats["weekday_corr"],
+            "Data Points": len(x),
+            "Holiday Points": int(is_holiday.sum()),
+            "Weekday Points": int(is_weekday.sum())
         })
         
-        # Fit linear trendline
-        if len(room_data) > 1:
-            # Linear regression
-            slope, intercept, r_value, p_value, std_err = stats.linregress(room_data["Overall_Occupancy"], room_data["Average Room Rate"])
-            x_trend = np.linspace(room_data["Overall_Occupancy"].min(), room_data["Overall_Occupancy"].max(), 100)
+        # Linear and polynomial (degree 2) trendlines
+        x_trend = np.linspace(x.min(), x.max(), 100)
+        if stats["linear"] is not None:
+            slope, intercept = stats["linear"]
             y_trend = slope * x_trend + intercept
             ax.plot(x_trend, y_trend/1e6, '--', color='red', alpha=0.8, linewidth=2, 
                    label=f'Linear (r={overall_corr:.3f})')
-            
-            # Polynomial trendline (degree 2) using numpy
-            try:
-                # Fit polynomial: y = ax^2 + bx + c
-                coeffs = np.polyfit(room_data["Overall_Occupancy"], room_data["Average Room Rate"], 2)
-                x_poly = np.linspace(room_data["Overall_Occupancy"].min(), room_data["Overall_Occupancy"].max(), 100)
-                y_poly_trend = np.polyval(coeffs, x_poly)
-                ax.plot(x_poly, y_poly_trend/1e6, '-', color='orange', alpha=0.8, linewidth=2, 
-                       label='Polynomial (deg=2)')
-            except:
-                pass
+        if stats["poly"] is not None:
+            y_poly_trend = eval_polynomial(stats["poly"], x_trend)
+            ax.plot(x_trend, y_poly_trend/1e6, '-', color='orange', alpha=0.8, linewidth=2, 
+                   label='Polynomial (deg=2)')
         
         # Formatting
         ax.set_xlabel('Overall Occupancy Rate')
@@ -112,11 +195,12 @@ def analyze_arr_occupancy_relationship():
         ax.grid(True, alpha=0.3)
         
         # Set consistent y-axis limits
-        ax.set_ylim(0, max(room_data["Average Room Rate"].max()/1e6 * 1.1, 1))
+        ax.set_ylim(0, max(y.max()/1e6 * 1.1, 1))
     
     plt.tight_layout()
-    plt.savefig("data/arr_occupancy_analysis_updated.png", dpi=300, bbox_inches='tight')
-    plt.show()
+    # Scatter layers are rasterized (trendlines stay vector); 150 dpi is plenty for a 16x12in figure
+    plt.savefig("data/arr_occupancy_analysis_updated.png", dpi=150, bbox_inches='tight')
+    plt.close(fig)
     
     # Create correlation summary
     corr_df = pd.DataFrame(correlation_results)
@@ -129,34 +213,19 @@ def analyze_arr_occupancy_relationship():
     print("\n=== EXPONENTIAL RELATIONSHIP ANALYSIS ===")
     
     for room_type in room_types:
-        room_data = df_with_occ[df_with_occ["Room Type"] == room_type].copy()
-        room_data = room_data.dropna(subset=["Average Room Rate", "Overall_Occupancy"])
+        if room_type not in room_stats or room_stats[room_type]["exp"] is None:  # Need sufficient data
+            continue
+        
+        # Exponential model: ARR = a * exp(b * occupancy)
+        a, b, r_squared_exp = room_stats[room_type]["exp"]
+        linear_r_squared = room_stats[room_type]["overall_corr"] ** 2
         
-        if len(room_data) > 10:  # Need sufficient data
-            # Log transformation for exponential fit
-            log_arr = np.log(room_data["Average Room Rate"])
-            occupancy = room_data["Overall_Occupancy"]
-            
-            # Fit exponential model: ARR = a * exp(b * occupancy)
-            slope, intercept, r_value, p_value, std_err = stats.linregress(occupancy, log_arr)
-            
-            # Calculate exponential parameters
-            a = np.exp(intercept)
-            b = slope
-            
-            # Calculate R² for exponential model
-            predicted_log_arr = slope * occupancy + intercept
-            predicted_arr = np.exp(predicted_log_arr)
-            ss_res = np.sum((room_data["Average Room Rate"] - predicted_arr) ** 2)
-            ss_tot = np.sum((room_data["Average Room Rate"] - room_data["Average Room Rate"].mean()) ** 2)
-            r_squared_exp = 1 - (ss_res / ss_tot)
-            
-            print(f"{room_type}:")
-            print(f"  Exponential model: ARR = {a:.0f} * exp({b:.3f} * occupancy)")
-            print(f"  R² (exponential): {r_squared_exp:.3f}")
-            print(f"  Linear R²: {overall_corr**2:.3f}")
-            print(f"  Exponential fit {'better' if r_squared_exp > overall_corr**2 else 'worse'} than linear")
-            print()
+        print(f"{room_type}:")
+        print(f"  Exponential model: ARR = {a:.0f} * exp({b:.3f} * occupancy)")
+        print(f"  R² (exponential): {r_squared_exp:.3f}")
+        print(f"  Linear R²: {linear_r_squared:.3f}")
+        print(f"  Exponential fit {'better' if r_squared_exp > linear_r_squared else 'worse'} than linear")
+        print()
     
     return corr_df
 
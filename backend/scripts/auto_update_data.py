@@ -4,7 +4,6 @@ Auto Update Data Pipeline
 Runs data extraction, forecasting, and notifies frontend
 """
 
-import subprocess
 import requests
 import time
 import os
@@ -19,16 +18,18 @@ def run_data_pipeline():
     print("=== STARTING AUTO DATA UPDATE PIPELINE ===")
     
     try:
+        # Steps run in this interpreter: no per-step Python start-up or pandas/sklearn re-import
+        from data_extraction import main as extract_main
+        from forecast import main as forecast_main
+        
         # Step 1: Data extraction
         print("1. Running data extraction...")
-        result1 = subprocess.run(["python3", "data_extraction.py"], 
-                               capture_output=True, text=True, check=True)
+        extract_main()
         print("✅ Data extraction completed")
         
         # Step 2: Unified Forecasting (includes daily variation and transparency)
         print("2. Running unified forecasting with transparency...")
-        result2 = subprocess.run(["python3", "forecast.py"], 
-                               capture_output=True, text=True, check=True)
+        forecast_main()
         print("✅ Unified forecasting completed (core + enhanced + evaluation)")
         
         # Step 3: Notify backend to refresh cache
@@ -49,12 +50,8 @@ def run_data_pipeline():
         
         return True
         
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Pipeline failed at step: {e.cmd}")
-        print(f"Error: {e.stderr}")
-        return False
     except Exception as e:
-        print(f"❌ Unexpected error: {e}")
+        print(f"❌ Pipeline failed: {e}")
         return False
 
 if __name__ == "__main__":
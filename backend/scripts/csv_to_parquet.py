@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Convert combined_df.csv to a Parquet dataset
+Partitioned by Year/Month so the API can push date filters down to disk
+"""
+
+import os
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+COMBINED_CSV = "data/combined_df.csv"
+COMBINED_PARQUET = "data/combined_df.parquet"
+
+PARTITIONING = ds.partitioning(pa.schema([("Year", pa.int16()), ("Month", pa.int8())]), flavor="hive")
+
+def is_fresh(parquet_path: str, csv_path: str) -> bool:
+    """True if the Parquet copy exists and is not older than its CSV"""
+    if not os.path.exists(parquet_path):
+        return False
+    return not os.path.exists(csv_path) or os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path)
+
+def convert_combined(csv_path: str = COMBINED_CSV, parquet_path: str = COMBINED_PARQUET) -> str:
+    """Write combined_df.csv as a hive-partitioned Parquet dataset (Year=YYYY/Month=M)"""
+    df = pd.read_csv(csv_path)
+    df["Date"] = pd.to_datetime(df["Date"])
+    df["Year"] = df["Date"].dt.year.astype("int16")
+    df["Month"] = df["Date"].dt.month.astype("int8")
+    df = df.sort_values("Date", kind="stable").reset_index(drop=True)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    # Build the new dataset in a sibling directory so readers never see a half-written one
+    tmp_path = f"{parquet_path}.tmp-{os.getpid()}"
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    ds.write_dataset(
+        table,
+        tmp_path,
+        format="parquet",
+        partitioning=PARTITIONING,
+        existing_data_behavior="overwrite_or_ignore",
+    )
+
+    # os.replace cannot overwrite a non-empty directory: move the old one aside, swap the new one in,
+    # and only then delete the old files (stale partitions never linger)
+    old_path = f"{parquet_path}.old-{os.getpid()}"
+    if os.path.exists(parquet_path):
+        os.replace(parquet_path, old_path)
+    os.replace(tmp_path, parquet_path)
+    if os.path.exists(old_path):
+        shutil.rmtree(old_path)
+    return parquet_path
+
+if __name__ == "__main__":
+    print("=== CSV → PARQUET CONVERSION ===")
+    out_path = convert_combined()
+    print(f"Saved Parquet dataset: {out_path}")
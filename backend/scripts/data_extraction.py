@@ -1,10 +1,13 @@
 # data_extraction.py - Data extraction and processing
 # ORGANIZED BACKEND STRUCTURE VERSION
 import os
+import numpy as np
 import pandas as pd
 from sqlalchemy import create_engine, text
 import json
+from functools import lru_cache
 import re
+from csv_to_parquet import is_fresh
 
 try:
     from dotenv import load_dotenv
@@ -16,16 +19,29 @@ DATABASE_URL = os.environ.get("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set. Create a .env with DATABASE_URL=... or export it in your shell.")
 
+# One engine (and connection pool) per process; connections are checked before reuse
+_ENGINE = create_engine(DATABASE_URL, pool_size=4, pool_pre_ping=True)
+
+@lru_cache(maxsize=4)
+def _load_holidays_csv(csv_path: str, mtime_ns: int) -> pd.DataFrame:
+    """Read and date-parse holidays_info.csv once per (path, mtime); callers filter the shared frame, never mutate it.
+
+    A pipeline run reads the file once either way; mtime_ns is part of the cache key only so that a caller
+    that imports this module and keeps it loaded (a notebook, a REPL) re-reads the file after it is edited.
+    """
+    df = pd.read_csv(csv_path, dtype={"Kind": "category"})
+    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+    return df
+
 def holidays_from_csv(csv_path: str = "../data/holidays_info.csv", kind_filter: str = None) -> set:
     """Parse holidays from holidays_info.csv (UPDATED PATH)"""
     if not os.path.exists(csv_path):
         return set()
     try:
-        df = pd.read_csv(csv_path)
+        df = _load_holidays_csv(csv_path, os.stat(csv_path).st_mtime_ns)
         if kind_filter:
             df = df[df["Kind"] == kind_filter]
-        dates = pd.to_datetime(df["Date"], errors="coerce").dropna()
-        return set(dates.dt.date)
+        return set(df["Date"].dropna().dt.date)
     except Exception:
         return set()
 
@@ -46,58 +62,50 @@ def holidays_from_env_json(env_var: str = "HOLIDAYS_JSON") -> set:
     except Exception:
         return set()
 
-def load_data(date_start: str = "2024-01-01", date_end: str = "2025-12-31") -> pd.DataFrame:
+# Reservation columns used by expand_stays_to_daily_rows
+RESERVATION_COLUMNS = ["arrival_date", "depart_date", "room_type", "room_number", "arrangement", "segment", "room_rate"]
+
+def _guarded_date(column: str) -> str:
+    """SQL expression casting a text date column to date, NULL (not an error) for malformed values"""
+    return f"CASE WHEN {column}::text ~ '^\\d{{4}}-\\d{{2}}-\\d{{2}}$' THEN {column}::date END"
+
+def _compact_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Parse dates/rates of one fetched chunk so only fixed-width columns pile up before concat"""
+    chunk["arrival_date"] = pd.to_datetime(chunk["arrival_date"], errors="coerce")
+    chunk["depart_date"] = pd.to_datetime(chunk["depart_date"], errors="coerce")
+    chunk["room_rate"] = pd.to_numeric(chunk["room_rate"], errors="coerce")
+    return chunk
+
+def load_data(date_start: str = "2024-01-01", date_end: str = "2025-12-31", chunksize: int = 200_000) -> pd.DataFrame:
     """Load reservation data from database"""
-    engine = create_engine(DATABASE_URL)
-    
-    typed_query = text("""
-        SELECT *
+    # Malformed text dates are filtered out as NULLs instead of aborting the whole query
+    query = text(f"""
+        SELECT {", ".join(RESERVATION_COLUMNS)}
         FROM public.reservasi_processed
-        WHERE (
-            (arrival_date ~ '^\\d{4}-\\d{2}-\\d{2}$' AND arrival_date::date BETWEEN :ds AND :de)
-            OR (depart_date ~ '^\\d{4}-\\d{2}-\\d{2}$' AND depart_date::date BETWEEN :ds AND :de)
-        )
+        WHERE {_guarded_date("arrival_date")} BETWEEN :ds AND :de
+           OR {_guarded_date("depart_date")} BETWEEN :ds AND :de
     """)
     
-    like_query = text("""
-        SELECT *
-        FROM public.reservasi_processed
-        WHERE (
-            arrival_date::text LIKE :y2024 OR arrival_date::text LIKE :y2025
-            OR depart_date::text LIKE :y2024 OR depart_date::text LIKE :y2025
-        )
-    """)
-    
-    try:
-        with engine.connect() as conn:
-            df = pd.read_sql(typed_query, conn, params={"ds": date_start, "de": date_end})
-            if df.empty:
-                raise Exception("Empty result; will try LIKE fallback")
-    except Exception:
-        with engine.connect() as conn2:
-            df = pd.read_sql(
-                like_query,
-                conn2,
-                params={"y2024": "%2024%", "y2025": "%2025%"},
-            )
-    return df
+    # Server-side cursor: each chunk is compacted as it arrives, so the raw text of the
+    # full result is never held at once
+    with _ENGINE.connect() as conn:
+        conn = conn.execution_options(stream_results=True)
+        chunks = [
+            _compact_chunk(chunk)
+            for chunk in pd.read_sql(query, conn, params={"ds": date_start, "de": date_end}, chunksize=chunksize)
+        ]
+    if not chunks:
+        return pd.DataFrame(columns=RESERVATION_COLUMNS)
+    return pd.concat(chunks, ignore_index=True)
 
-def _map_room_type(raw):
-    """Map raw room type to standardized room type"""
-    if not isinstance(raw, str) or len(raw) == 0:
-        return None
-    first = raw.strip().upper()[:1]
-    if first == "D":
-        return "Deluxe"
-    if first == "E":
-        return "Executive Suite"
-    if first == "S":
-        return "Suite"
-    if first == "B":
-        return "Executive Suite"
-    if first == "F":
-        return "Family Suite"
-    return None
+# Standardized room type by the first letter of the raw PMS room type
+_ROOM_MAP = {
+    "D": "Deluxe",
+    "E": "Executive Suite",
+    "B": "Executive Suite",
+    "S": "Suite",
+    "F": "Family Suite",
+}
 
 def expand_stays_to_daily_rows(df: pd.DataFrame) -> pd.DataFrame:
     """Expand reservations to daily rows"""
@@ -109,42 +117,52 @@ def expand_stays_to_daily_rows(df: pd.DataFrame) -> pd.DataFrame:
     work["depart_date"] = pd.to_datetime(work["depart_date"], errors="coerce")
     work = work.dropna(subset=["arrival_date", "depart_date"])
     
-    rows = []
-    for _, row in work.iterrows():
-        if row["depart_date"] <= row["arrival_date"]:
-            continue
-        d_range = pd.date_range(start=row["arrival_date"].normalize(), end=(row["depart_date"] - pd.Timedelta(days=1)).normalize(), freq="D")
-        
-        seg_val = row.get("segment") if "segment" in work.columns else None
-        
-        total_room_rate = None
-        if "room_rate" in work.columns and pd.notna(row.get("room_rate")):
-            try:
-                total_room_rate = float(row.get("room_rate"))
-            except Exception:
-                total_room_rate = None
-        
-        nightly_rate = float(total_room_rate) if total_room_rate is not None else None
-        
-        raw_room = row.get("room_type")
-        mapped_room = _map_room_type(raw_room) if "room_type" in work.columns else None
-        final_room = mapped_room if mapped_room else (str(raw_room).strip() if pd.notna(raw_room) and str(raw_room).strip() != "" else None)
-        
-        for d in d_range:
-            rows.append({
-                "date": d.date(),
-                "room_type": final_room,
-                "arrangement": row.get("arrangement") if "arrangement" in work.columns else None,
-                "room_number": row.get("room_number") if "room_number" in work.columns else None,
-                "segment": seg_val,
-                "nightly_rate": nightly_rate,
-            })
-    
-    daily = pd.DataFrame(rows)
-    if not daily.empty and "room_type" in daily.columns:
-        daily = daily[daily["room_type"].notna()]
+    # Nights per stay: arrival day up to (not including) the departure day
+    first_night = work["arrival_date"].dt.normalize()
+    last_night = (work["depart_date"] - pd.Timedelta(days=1)).dt.normalize()
+    nights = ((last_night - first_night).dt.days + 1).clip(lower=0)
+    nights = nights.where(work["depart_date"] > work["arrival_date"], 0).to_numpy(dtype=np.int64)
+    
+    # One output row per night: repeat each stay, then offset its first night by 0..nights-1 days
+    idx = np.repeat(np.arange(len(work)), nights)
+    offsets = np.arange(nights.sum()) - np.repeat(nights.cumsum() - nights, nights)
+    dates = first_night.to_numpy()[idx] + offsets.astype("timedelta64[D]")
+    
+    if "room_rate" in work.columns:
+        nightly_rate = pd.to_numeric(work["room_rate"], errors="coerce").astype(float)
+    else:
+        nightly_rate = pd.Series(np.nan, index=work.index)
+    
+    if "room_type" in work.columns:
+        raw_room = work["room_type"]
+        stripped = raw_room.astype(str).str.strip()
+        fallback = stripped.where(raw_room.notna() & (stripped != ""))
+        first = raw_room.astype("string").str.strip().str.slice(0, 1).str.upper()
+        final_room = first.map(_ROOM_MAP).astype(object).fillna(fallback)
+    else:
+        final_room = pd.Series(None, index=work.index, dtype=object)
+    
+    def _per_night(values):
+        return values.to_numpy()[idx]
+    
+    daily = pd.DataFrame({
+        "date": dates,
+        "room_type": _per_night(final_room),
+        "arrangement": _per_night(work["arrangement"]) if "arrangement" in work.columns else None,
+        "room_number": _per_night(work["room_number"]) if "room_number" in work.columns else None,
+        "segment": _per_night(work["segment"]) if "segment" in work.columns else None,
+        "nightly_rate": _per_night(nightly_rate),
+    })
+    daily = daily[daily["room_type"].notna()]
     return daily
 
+def _isin_dates(dates_D: np.ndarray, date_set) -> np.ndarray:
+    """Flag datetime64[D] dates found in a set of dates/timestamps (all False for an empty set)"""
+    if not date_set:
+        return np.zeros(len(dates_D), dtype=bool)
+    set_D = pd.to_datetime(list(date_set)).to_numpy().astype("datetime64[D]")
+    return np.isin(dates_D, set_D)
+
 def load_maintenance_data(maintenance_csv_path: str = "data/maintenance_cleaned.csv"):
     """Load maintenance data to get rooms out of order"""
     try:
@@ -180,47 +198,48 @@ def build_feature_dataset(source_df: pd.DataFrame, excluded_segments=None, inven
     )
     
     # DAILY OCCUPANCY CALCULATION (not per room type)
-    # Calculate daily totals for occupancy including maintenance
-    daily_occ_data = []
+    # Calculate daily totals for occupancy including maintenance in one groupby pass:
+    # rooms sold (excluding excluded segments), blocked (excluded segments) and seen at all
+    room_counts = daily.assign(
+        sold_room=daily["room_number"].where(daily["paid_flag"]),
+        blocked_room=daily["room_number"].where(~daily["paid_flag"]),
+    ).groupby("date").agg(
+        total_rooms_sold=("sold_room", "nunique"),
+        total_rooms_blocked=("blocked_room", "nunique"),
+        rooms_seen=("room_number", "nunique"),
+    )
+    dates = room_counts.index
+    total_rooms_sold = room_counts["total_rooms_sold"]
+    total_rooms_blocked = room_counts["total_rooms_blocked"]
+    
+    # Total rooms under maintenance
+    if maintenance_df is not None and not maintenance_df.empty:
+        total_rooms_maintenance = (
+            maintenance_df.groupby(maintenance_df["Date"].dt.normalize())["Quantity"].sum()
+            .reindex(dates, fill_value=0)
+        )
+    else:
+        total_rooms_maintenance = pd.Series(0, index=dates)
     
-    for date in daily["date"].unique():
-        date_data = daily[daily["date"] == date]
-        
-        # Total rooms sold (excluding excluded segments)
-        total_rooms_sold = date_data[date_data["paid_flag"]].dropna(subset=["room_number"])["room_number"].nunique()
-        
-        # Total rooms blocked (excluded segments)
-        total_rooms_blocked = date_data[~date_data["paid_flag"]].dropna(subset=["room_number"])["room_number"].nunique()
-        
-        # Total rooms under maintenance
-        total_rooms_maintenance = 0
-        if maintenance_df is not None and not maintenance_df.empty:
-            maintenance_date = pd.to_datetime(date)
-            maintenance_for_date = maintenance_df[maintenance_df["Date"].dt.date == maintenance_date.date()]
-            total_rooms_maintenance = maintenance_for_date["Quantity"].sum()
-        
-        # Total available inventory
-        if inventory_per_room_type:
-            total_inventory = sum(inventory_per_room_type.values())
-        else:
-            # Infer total inventory
-            total_inventory = date_data.dropna(subset=["room_number"])["room_number"].nunique()
-        
-        # Daily occupancy rate (subtract both blocked and maintenance rooms)
-        available_inventory = max(1, total_inventory - total_rooms_blocked - total_rooms_maintenance)
-        daily_occupancy_rate = min(1.0, total_rooms_sold / available_inventory)
-        
-        daily_occ_data.append({
-            "date": date,
-            "daily_occupancy_rate": daily_occupancy_rate,
-            "total_rooms_sold": total_rooms_sold,
-            "total_rooms_blocked": total_rooms_blocked,
-            "total_rooms_maintenance": total_rooms_maintenance,
-            "total_inventory": total_inventory,
-            "available_inventory": available_inventory
-        })
-    
-    daily_occ_df = pd.DataFrame(daily_occ_data)
+    # Total available inventory
+    if inventory_per_room_type:
+        total_inventory = pd.Series(sum(inventory_per_room_type.values()), index=dates)
+    else:
+        # Infer total inventory
+        total_inventory = room_counts["rooms_seen"]
+    
+    # Daily occupancy rate (subtract both blocked and maintenance rooms)
+    available_inventory = (total_inventory - total_rooms_blocked - total_rooms_maintenance).clip(lower=1)
+    daily_occupancy_rate = (total_rooms_sold / available_inventory).clip(upper=1.0)
+    
+    daily_occ_df = pd.concat({
+        "daily_occupancy_rate": daily_occupancy_rate,
+        "total_rooms_sold": total_rooms_sold,
+        "total_rooms_blocked": total_rooms_blocked,
+        "total_rooms_maintenance": total_rooms_maintenance,
+        "total_inventory": total_inventory,
+        "available_inventory": available_inventory,
+    }, axis=1).reset_index()
     
     # Merge ADR data with daily occupancy
     agg = adr_agg.merge(daily_occ_df, on="date", how="left")
@@ -234,26 +253,18 @@ def build_feature_dataset(source_df: pd.DataFrame, excluded_segments=None, inven
     # Fill missing arrangement values with empty string
     agg["arrangement"] = agg["arrangement"].fillna("")
     
-    # Add weekend & holiday flags
-    agg["date"] = pd.to_datetime(agg["date"]).dt.date
-    agg["is_weekend"] = pd.to_datetime(agg["date"]).dt.weekday >= 5
-    
-    if holidays_set is not None and len(holidays_set) > 0:
-        agg["is_holiday"] = pd.to_datetime(agg["date"]).isin(list(holidays_set))
-    else:
-        agg["is_holiday"] = False
+    # Add weekend & holiday flags, probing one datetime64[D] view of the dates
+    agg_dates = pd.to_datetime(agg["date"])
+    dates_D = agg_dates.to_numpy().astype("datetime64[D]")
+    agg["date"] = agg_dates.dt.date
+    agg["is_weekend"] = agg_dates.dt.weekday >= 5
+    agg["is_holiday"] = _isin_dates(dates_D, holidays_set)
     
     # Add event flag
-    if events_set is not None and len(events_set) > 0:
-        agg["is_event"] = pd.to_datetime(agg["date"]).isin(list(events_set))
-    else:
-        agg["is_event"] = False
+    agg["is_event"] = _isin_dates(dates_D, events_set)
     
     # Add fasting flag
-    if fasting_set is not None and len(fasting_set) > 0:
-        agg["is_fasting"] = pd.to_datetime(agg["date"]).isin(list(fasting_set))
-    else:
-        agg["is_fasting"] = False
+    agg["is_fasting"] = _isin_dates(dates_D, fasting_set)
     
     
     # Final columns
@@ -275,12 +286,24 @@ def build_feature_dataset(source_df: pd.DataFrame, excluded_segments=None, inven
         "is_fasting": "Is_Fasting",
     })
     final = final.sort_values(["Date", "Room Type"]).reset_index(drop=True)
+    # Narrow storage: byte-wide flags, float32 rates (ARR ~1e6 keeps well within float32 precision)
+    for col in ["Is_Holiday", "Is_Weekend", "Is_Event", "Is_Fasting"]:
+        final[col] = final[col].astype(np.bool_)
+    final["Average Room Rate"] = final["Average Room Rate"].astype(np.float32)
+    final["Occupancy Rate"] = final["Occupancy Rate"].astype(np.float32)
+    # A handful of distinct values each: int8 codes instead of per-row strings
+    final["Room Type"] = final["Room Type"].astype("category")
+    final["Arrangement"] = final["Arrangement"].astype("category")
     return final
 
 def build_overall_occupancy_series(dataset_csv: str) -> pd.DataFrame:
     """Build overall occupancy series with CORRECTED calculation"""
-    df = pd.read_csv(dataset_csv)
-    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+    columns = ["Date", "Rooms Sold", "Available Inventory"]
+    dataset_parquet = os.path.splitext(dataset_csv)[0] + ".parquet"
+    if is_fresh(dataset_parquet, dataset_csv):
+        df = pd.read_parquet(dataset_parquet, columns=columns)
+    else:
+        df = pd.read_csv(dataset_csv, usecols=columns, parse_dates=["Date"], engine="c")
     
     # CORRECTED: Use Available Inventory instead of Room Inventory
     daily_agg = df.groupby("Date", as_index=False).agg({
@@ -292,7 +315,8 @@ def build_overall_occupancy_series(dataset_csv: str) -> pd.DataFrame:
     
     return daily_agg[["Date", "Overall_Occupancy"]]
 
-if __name__ == "__main__":
+def main() -> pd.DataFrame:
+    """Extract reservations, build dataset_processed and return the feature frame"""
     print("=== DATA EXTRACTION (ORGANIZED BACKEND STRUCTURE) ===")
     
     # Load data
@@ -340,13 +364,18 @@ if __name__ == "__main__":
     
     # Add school holidays
     features_df['Date'] = pd.to_datetime(features_df['Date'])
-    features_df['Is_SchoolHoliday'] = features_df['Date'].isin([pd.Timestamp(d) for d in school_holidays_set])
+    features_df['Is_SchoolHoliday'] = _isin_dates(features_df['Date'].to_numpy().astype('datetime64[D]'), school_holidays_set)
     
     # Save dataset - ABSOLUTE PATH
     features_path = "data/dataset_processed.csv"
     features_df.to_csv(features_path, index=False)
     print(f"Saved processed dataset: {features_path}")
     
+    # Typed columnar copy for the analysis scripts (CSV stays for compatibility)
+    features_parquet = "data/dataset_processed.parquet"
+    features_df.to_parquet(features_parquet, compression="zstd", index=False)
+    print(f"Saved processed dataset: {features_parquet}")
+    
     # Show sample
     print("\nSample data:")
     print(features_df.head())
@@ -355,4 +384,8 @@ if __name__ == "__main__":
     overall_occ = build_overall_occupancy_series(features_path)
     print(f"\nOverall occupancy range: {overall_occ['Overall_Occupancy'].min():.3f} - {overall_occ['Overall_Occupancy'].max():.3f}")
     
-    print("✅ Data extraction completed with organized backend structure")
\ No newline at end of file
+    print("✅ Data extraction completed with organized backend structure")
+    return features_df
+
+if __name__ == "__main__":
+    main()
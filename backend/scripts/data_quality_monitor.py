@@ -10,21 +10,24 @@ from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
+def _load(path):
+    """Read a monitored CSV with the pyarrow engine and Date already parsed to datetime64"""
+    return pd.read_csv(path, engine="pyarrow", parse_dates=["Date"])
+
 def check_data_quality():
     """Comprehensive data quality checks"""
     
     print("=== DATA QUALITY MONITORING ===")
     
     # Load current dataset
-    df = pd.read_csv("dataset_processed.csv")
-    df["Date"] = pd.to_datetime(df["Date"])
+    df = _load("dataset_processed.csv")
     
     quality_issues = []
     
     # 1. Date continuity check
     date_range = pd.date_range(df["Date"].min(), df["Date"].max(), freq="D")
-    missing_dates = set(date_range) - set(df["Date"])
-    if missing_dates:
+    missing_dates = np.setdiff1d(date_range.values, df["Date"].values)
+    if missing_dates.size:
         quality_issues.append(f"Missing dates: {len(missing_dates)} days")
     else:
         print("✅ Date continuity: GOOD")
@@ -37,18 +40,19 @@ def check_data_quality():
         else:
             print(f"✅ {room_type} inventory: CONSISTENT")
     
-    # 3. Rate reasonableness check
+    # 3. Rate reasonableness check (IQR bounds for every room type in one grouped pass)
+    rates = df.dropna(subset=["Average Room Rate"])
+    quartiles = rates.groupby("Room Type", sort=False)["Average Room Rate"].quantile([0.25, 0.75]).unstack()
+    q1, q3 = quartiles[0.25], quartiles[0.75]
+    iqr = q3 - q1
+    lower_bound = rates["Room Type"].map(q1 - 1.5 * iqr)
+    upper_bound = rates["Room Type"].map(q3 + 1.5 * iqr)
+    is_outlier = (rates["Average Room Rate"] < lower_bound) | (rates["Average Room Rate"] > upper_bound)
+    outlier_pcts = is_outlier.groupby(rates["Room Type"], sort=False).mean() * 100
+    
     for room_type in df["Room Type"].unique():
-        room_rates = df[df["Room Type"] == room_type]["Average Room Rate"].dropna()
-        
-        if len(room_rates) > 0:
-            q1, q3 = room_rates.quantile([0.25, 0.75])
-            iqr = q3 - q1
-            lower_bound = q1 - 1.5 * iqr
-            upper_bound = q3 + 1.5 * iqr
-            
-            outliers = room_rates[(room_rates < lower_bound) | (room_rates > upper_bound)]
-            outlier_pct = len(outliers) / len(room_rates) * 100
+        if room_type in outlier_pcts.index:
+            outlier_pct = outlier_pcts[room_type]
             
             if outlier_pct > 5:  # More than 5% outliers
                 quality_issues.append(f"{room_type} rate outliers: {outlier_pct:.1f}%")
@@ -64,10 +68,10 @@ def check_data_quality():
     
     # 5. Segment consistency check
     excluded_segments = ["LGSTAY", "COMP", "HU"]
-    for room_type in df["Room Type"].unique():
-        room_data = df[df["Room Type"] == room_type]
-        max_sold = room_data["Rooms Sold"].max()
-        inventory = room_data["Room Inventory"].iloc[0]
+    room_groups = df.groupby("Room Type", sort=False)
+    inventory_by_room = room_groups["Room Inventory"].first()
+    for room_type, max_sold in room_groups["Rooms Sold"].max().items():
+        inventory = inventory_by_room[room_type]
         
         if max_sold > inventory:
             quality_issues.append(f"{room_type}: Rooms sold ({max_sold}) > Inventory ({inventory})")
@@ -75,16 +79,15 @@ def check_data_quality():
             print(f"✅ {room_type} sold/inventory: LOGICAL")
     
     # 6. Holiday data consistency
-    holidays_df = pd.read_csv("holidays_info.csv")
-    holidays_df["Date"] = pd.to_datetime(holidays_df["Date"])
+    holidays_df = _load("holidays_info.csv")
     
-    dataset_holidays = set(df[df["Is_Holiday"] == True]["Date"].dt.date)
-    file_holidays = set(holidays_df[holidays_df["Kind"].isin(["national", "joint"])]["Date"].dt.date)
+    dataset_holidays = df.loc[df["Is_Holiday"] == True, "Date"].values.astype("datetime64[D]")
+    file_holidays = holidays_df.loc[holidays_df["Kind"].isin(["national", "joint"]), "Date"].values.astype("datetime64[D]")
     
-    missing_holidays = file_holidays - dataset_holidays
-    extra_holidays = dataset_holidays - file_holidays
+    missing_holidays = np.setdiff1d(file_holidays, dataset_holidays)
+    extra_holidays = np.setdiff1d(dataset_holidays, file_holidays)
     
-    if missing_holidays or extra_holidays:
+    if missing_holidays.size or extra_holidays.size:
         quality_issues.append(f"Holiday mismatch: {len(missing_holidays)} missing, {len(extra_holidays)} extra")
     else:
         print("✅ Holiday flags: CONSISTENT")
@@ -106,28 +109,33 @@ def forecast_performance_check():
     print("\n=== FORECAST PERFORMANCE MONITORING ===")
     
     # Load forecast results
-    forecast_df = pd.read_csv("forecasting_2026.csv")
-    forecast_df["Date"] = pd.to_datetime(forecast_df["Date"])
+    forecast_df = _load("forecasting_2026.csv")
     
     # Filter historical data with actuals
-    hist_data = forecast_df[forecast_df["Average Room Rate"].notna()].copy()
+    hist_data = forecast_df[forecast_df["Average Room Rate"].notna()]
     
     if len(hist_data) == 0:
         print("❌ No historical data found for performance check")
         return False
     
-    # Calculate current performance
-    hist_data["Error ARR"] = np.abs(hist_data["Average Room Rate"] - hist_data["Forecasted ARR"]) / hist_data["Average Room Rate"]
+    # Calculate current performance (absolute relative ARR error per row; NaN forecasts are skipped)
+    actual = hist_data["Average Room Rate"].to_numpy(np.float64)
+    predicted = hist_data["Forecasted ARR"].to_numpy(np.float64)
+    abs_rel = np.abs(actual - predicted) / actual
     
-    overall_mape = hist_data["Error ARR"].mean() * 100
+    overall_mape = np.nanmean(abs_rel) * 100
     
     print(f"Current Overall MAPE: {overall_mape:.2f}%")
     
     # Performance by room type
     print("\nRoom Type Performance:")
-    for room_type in hist_data["Room Type"].unique():
-        room_data = hist_data[hist_data["Room Type"] == room_type]
-        room_mape = room_data["Error ARR"].mean() * 100
+    # Per-room means as weighted bincounts over first-appearance room codes
+    codes, room_types = pd.factorize(hist_data["Room Type"])
+    counted = (codes >= 0) & ~np.isnan(abs_rel)
+    error_sums = np.bincount(codes[counted], weights=abs_rel[counted], minlength=len(room_types))
+    error_counts = np.bincount(codes[counted], minlength=len(room_types))
+    room_mapes = pd.Series(error_sums / error_counts * 100, index=room_types)
+    for room_type, room_mape in room_mapes.items():
         print(f"   {room_type}: {room_mape:.1f}% MAPE")
     
     # Performance alerts
@@ -136,10 +144,7 @@ def forecast_performance_check():
     if overall_mape > 25:
         alerts.append(f"Overall MAPE too high: {overall_mape:.2f}%")
     
-    for room_type in hist_data["Room Type"].unique():
-        room_data = hist_data[hist_data["Room Type"] == room_type]
-        room_mape = room_data["Error ARR"].mean() * 100
-        
+    for room_type, room_mape in room_mapes.items():
         if room_type == "Deluxe" and room_mape > 15:
             alerts.append(f"Deluxe MAPE degraded: {room_mape:.1f}%")
         elif room_type == "Executive Suite" and room_mape > 25:
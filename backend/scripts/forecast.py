@@ -1,91 +1,121 @@
+import os
 import pandas as pd
 import numpy as np
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from sklearn.ensemble import RandomForestRegressor
+from joblib import Memory
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from threadpoolctl import threadpool_limits
 
 # ==============================================================================
 # ML-BASED PIPELINE (aligned with backend/data/testfixed.ipynb)
 # ==============================================================================
 
-def _build_enrich_calendar_features(df: pd.DataFrame) -> pd.DataFrame:
-    """Replicate notebook-style feature engineering at daily granularity.
+# holidays_info.csv Kind values (lower-cased) behind each calendar flag
+NATIONAL_KINDS = ['national', 'joint', 'national holiday', 'joint holiday']
+SCHOOL_KINDS = ['school', 'school holiday']
+EVENT_KINDS = ['event']
 
-    Expects columns: Date, Occupancy Rate, Is_Holiday, Is_Weekend, Is_Event, Is_SchoolHoliday
-    Returns daily DataFrame with features used for ML models.
-    """
-    enrich = df.copy()
-    # Keep one row per date with the target occupancy rate
-    enrich = (enrich.groupby(['Date', 'Occupancy Rate', 'Is_Holiday', 'Is_Weekend', 'Is_Event', 'Is_SchoolHoliday'])
-                    .size().reset_index().drop(columns=0))
-    enrich = enrich.rename(columns={'Is_Holiday': 'Is_NationalHoliday'})
-    enrich = enrich.sort_values('Date').reset_index(drop=True)
+# 'rf' (default) keeps the notebook's random forests; 'hgb' trains histogram gradient boosting instead
+FORECAST_MODEL = os.getenv('FORECAST_MODEL', 'rf').lower()
 
-    # Bridge day between holidays/weekends
-    seed_hol = (enrich['Is_NationalHoliday'].astype(bool) | enrich['Is_Weekend'].astype(bool)).to_numpy()
-    n = len(seed_hol)
+# Trained models are memoized on disk, keyed by a hash of the unfitted estimator (all hyperparameters) and its
+# training data. Relative cache dirs resolve against backend/, so CLI and in-process runs share one cache;
+# set FORECAST_CACHE_DIR='' to disable. Oldest entries are evicted past FORECAST_CACHE_MAX_MB.
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_CACHE_DIR = os.getenv('FORECAST_CACHE_DIR', '.cache')
+_MEMORY = Memory(os.path.join(_BACKEND_DIR, _CACHE_DIR) if _CACHE_DIR else None, verbose=0)
+_CACHE_BYTES_LIMIT = int(os.getenv('FORECAST_CACHE_MAX_MB', 256)) * 1024 * 1024
+
+# Forecast outputs are always written as Parquet; WRITE_CSV=0 skips the human-readable CSV copies
+WRITE_CSV = os.getenv('WRITE_CSV', '1') != '0'
 
-    left_seed  = np.r_[False, seed_hol[:-1]]
-    right_seed = np.r_[seed_hol[1:], False]
-    is_bridge = (~seed_hol) & left_seed & right_seed
-    enrich['Is_Bridge'] = is_bridge
+def _load(path: str) -> pd.DataFrame:
+    """Read a pipeline CSV with the pyarrow engine, Date parsed to datetime64 once for every later stage"""
+    return pd.read_csv(path, engine="pyarrow", parse_dates=["Date"])
 
-    is_nat = enrich['Is_NationalHoliday'].to_numpy(dtype=bool)
-    is_we  = enrich['Is_Weekend'].to_numpy(dtype=bool)
-    is_br  = enrich['Is_Bridge'].to_numpy(dtype=bool)
+def _neighbours(mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Return (previous-day, next-day) views of a daily bool mask, padded with False at the ends"""
+    padded = np.zeros(len(mask) + 2, dtype=bool)
+    padded[1:-1] = mask
+    return padded[:-2], padded[2:]
+
+def _derive_calendar(is_nat: np.ndarray, is_we: np.ndarray) -> dict:
+    """Derive bridge/holiday-block/distance features from daily national-holiday and weekend flags.
+
+    Both inputs are bool arrays over consecutive days. Returns a dict of arrays keyed by the
+    output column names, in the column order the models were trained with.
+    """
+    # Bridge day between holidays/weekends
+    seed_hol = is_nat | is_we
+    left_seed, right_seed = _neighbours(seed_hol)
+    is_br = (~seed_hol) & left_seed & right_seed
 
     base = is_nat | is_br
 
-    left_base  = np.r_[False, base[:-1]]
-    right_base = np.r_[base[1:], False]
+    left_base, right_base = _neighbours(base)
     wk1 = is_we & (left_base | right_base)
 
-    left_wk1  = np.r_[False, wk1[:-1]]
-    right_wk1 = np.r_[wk1[1:], False]
+    left_wk1, right_wk1 = _neighbours(wk1)
     wk2 = is_we & (left_wk1 | right_wk1)
 
-    is_holiday_final = base | wk1 | wk2
-    enrich['Is_Holiday'] = is_holiday_final
+    is_hol = base | wk1 | wk2
 
     # Block sizing for holiday spans
-    block_id = (~is_holiday_final).cumsum()
-    enrich['Holiday_Duration'] = 0
-    enrich['Days_of_Holiday'] = 0
-
-    mask = is_holiday_final
-    grp = pd.Series(block_id[mask]).groupby(block_id[mask])
-    sizes = grp.transform('size').to_numpy() if len(grp) else np.array([])
-    
-    order_in_block = grp.cumcount() + 1 if len(grp) else pd.Series([], dtype=int)
-    if len(sizes):
-        enrich.loc[mask, 'Holiday_Duration'] = sizes
-        enrich.loc[mask, 'Days_of_Holiday'] = order_in_block.to_numpy()
+    block_id = (~is_hol).cumsum()
+    holiday_duration = np.zeros(len(is_hol), dtype=np.int64)
+    days_of_holiday = np.zeros(len(is_hol), dtype=np.int64)
+    bid = block_id[is_hol]
+    if len(bid):
+        # bid is non-decreasing, so each block's first row is found by searchsorted
+        holiday_duration[is_hol] = np.bincount(bid)[bid]
+        days_of_holiday[is_hol] = np.arange(len(bid)) - np.searchsorted(bid, bid) + 1
 
     # Distance to nearest holiday
-    is_hol = enrich['Is_Holiday'].to_numpy(dtype=bool)
-    n = len(enrich)
     INF = 10**9
-    dist_fwd = np.full(n, INF, dtype=int)
-    last = -INF
-    for i in range(n):
-        if is_hol[i]:
-            last = i
-        dist_fwd[i] = i - last
-    dist_bwd = np.full(n, INF, dtype=int)
-    last = INF
-    for i in range(n - 1, -1, -1):
-        if is_hol[i]:
-            last = i
-        dist_bwd[i] = last - i
-    dist = np.minimum(dist_fwd, dist_bwd)
+    idx = np.arange(len(is_hol), dtype=np.int64)
+    # Running index of the previous / next holiday, as one cumulative scan each way
+    last_hol = np.maximum.accumulate(np.where(is_hol, idx, -INF))
+    next_hol = np.minimum.accumulate(np.where(is_hol, idx, INF)[::-1])[::-1]
+    dist = np.minimum(idx - last_hol, next_hol - idx)
     dist[is_hol] = 0
-    enrich['Distance_to_Holiday'] = dist
+
+    return {
+        'Is_Bridge': is_br,
+        'Is_Holiday': is_hol,
+        'Holiday_Duration': holiday_duration,
+        'Days_of_Holiday': days_of_holiday,
+        'Distance_to_Holiday': dist,
+    }
+
+def _add_date_parts(frame: pd.DataFrame) -> None:
+    """Add Day_of_Week/Day_of_Month/Month/Year columns from one parse of frame['Date']"""
+    dates = pd.DatetimeIndex(frame['Date'])
+    frame['Day_of_Week']  = dates.dayofweek
+    frame['Day_of_Month'] = dates.day
+    frame['Month']        = dates.month
+    frame['Year']         = dates.year
+
+def _build_enrich_calendar_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Replicate notebook-style feature engineering at daily granularity.
+
+    Expects columns: Date, Occupancy Rate, Is_Holiday, Is_Weekend, Is_Event, Is_SchoolHoliday
+    Returns daily DataFrame with features used for ML models.
+    """
+    # Keep one row per date with the target occupancy rate
+    enrich = (df.groupby(['Date', 'Occupancy Rate', 'Is_Holiday', 'Is_Weekend', 'Is_Event', 'Is_SchoolHoliday'])
+                    .size().reset_index().drop(columns=0))
+    enrich = enrich.rename(columns={'Is_Holiday': 'Is_NationalHoliday'})
+    enrich = enrich.sort_values('Date').reset_index(drop=True)
+
+    # Bridge/holiday-block/distance features
+    calendar = _derive_calendar(enrich['Is_NationalHoliday'].to_numpy(dtype=bool), enrich['Is_Weekend'].to_numpy(dtype=bool))
+    for col, values in calendar.items():
+        enrich[col] = values
 
     # Date parts
-    enrich['Day_of_Week']  = pd.to_datetime(enrich['Date']).dt.dayofweek
-    enrich['Day_of_Month'] = pd.to_datetime(enrich['Date']).dt.day
-    enrich['Month']        = pd.to_datetime(enrich['Date']).dt.month
-    enrich['Year']         = pd.to_datetime(enrich['Date']).dt.year
+    _add_date_parts(enrich)
 
     return enrich
 
@@ -93,171 +123,142 @@ def _future_calendar_2026(holidays_df: pd.DataFrame, start_date: pd.Timestamp |
     """Create 2026 future calendar with the same engineered calendar features.
 
     If start_date is provided, the calendar starts from that date; otherwise defaults to 2026-01-01.
+    holidays_df['Date'] must already be datetime64 (see _load).
     """
-    holidays = holidays_df.copy()
-    holidays['Date'] = pd.to_datetime(holidays['Date'])
     start_2026 = pd.Timestamp('2026-01-01') if start_date is None else pd.Timestamp(start_date)
     end_2026 = pd.Timestamp('2026-12-31')
     future_cal = pd.date_range(start=start_2026, end=end_2026, freq='D')
 
-    rows = []
-    for date in future_cal:
-        is_weekend = date.weekday() >= 5
-        info = holidays[holidays['Date'] == date]
-        is_nat = False; is_school = False; is_event = False
-        if not info.empty:
-            kind = str(info.iloc[0]['Kind']).lower()
-            is_nat = kind in ['national', 'joint', 'national holiday', 'joint holiday']
-            is_school = kind in ['school', 'school holiday']
-            is_event = kind in ['event']
-        rows.append({
-            'Date': date,
-            'Is_NationalHoliday': is_nat,
-            'Is_Weekend': is_weekend,
-            'Is_Event': is_event,
-            'Is_SchoolHoliday': is_school,
-        })
-    future = pd.DataFrame(rows)
+    # First holiday row per date decides its kind, as one left merge over the calendar
+    first_kind = holidays_df.drop_duplicates('Date', keep='first')[['Date', 'Kind']]
+    kind = (pd.DataFrame({'Date': future_cal})
+              .merge(first_kind, on='Date', how='left')['Kind']
+              .astype(str).str.lower())
+    future = pd.DataFrame({
+        'Date': future_cal,
+        'Is_NationalHoliday': kind.isin(NATIONAL_KINDS).to_numpy(),
+        'Is_Weekend': future_cal.dayofweek >= 5,
+        'Is_Event': kind.isin(EVENT_KINDS).to_numpy(),
+        'Is_SchoolHoliday': kind.isin(SCHOOL_KINDS).to_numpy(),
+    })
 
     # Apply same bridge/holiday logic and derived features
-    seed_hol = (future['Is_NationalHoliday'].astype(bool) | future['Is_Weekend'].astype(bool)).to_numpy()
-    n = len(seed_hol)
-    
-    left_seed  = np.r_[False, seed_hol[:-1]]
-    right_seed = np.r_[seed_hol[1:], False]
-    is_bridge = (~seed_hol) & left_seed & right_seed
-    future['Is_Bridge'] = is_bridge
-
-    is_nat = future['Is_NationalHoliday'].to_numpy(dtype=bool)
-    is_we  = future['Is_Weekend'].to_numpy(dtype=bool)
-    is_br  = future['Is_Bridge'].to_numpy(dtype=bool)
-
-    base = is_nat | is_br
-
-    left_base  = np.r_[False, base[:-1]]
-    right_base = np.r_[base[1:], False]
-    wk1 = is_we & (left_base | right_base)
-
-    left_wk1  = np.r_[False, wk1[:-1]]
-    right_wk1 = np.r_[wk1[1:], False]
-    wk2 = is_we & (left_wk1 | right_wk1)
-
-    is_holiday_final = base | wk1 | wk2
-    future['Is_Holiday'] = is_holiday_final
-
-    block_id = (~is_holiday_final).cumsum()
-    future['Holiday_Duration'] = 0
-    future['Days_of_Holiday'] = 0
-
-    mask = is_holiday_final
-    grp = pd.Series(block_id[mask]).groupby(block_id[mask])
-    sizes = grp.transform('size').to_numpy() if len(grp) else np.array([])
-
-    order_in_block = grp.cumcount() + 1 if len(grp) else pd.Series([], dtype=int)
-    if len(sizes):
-        future.loc[mask, 'Holiday_Duration'] = sizes
-        future.loc[mask, 'Days_of_Holiday'] = order_in_block.to_numpy()
-
-    # Distance to nearest holiday
-    is_hol = future['Is_Holiday'].to_numpy(dtype=bool)
-    n = len(future)
-    INF = 10**9
-    dist_fwd = np.full(n, INF, dtype=int)
-    last = -INF
-    for i in range(n):
-        if is_hol[i]:
-            last = i
-        dist_fwd[i] = i - last
-    dist_bwd = np.full(n, INF, dtype=int)
-    last = INF
-    for i in range(n - 1, -1, -1):
-        if is_hol[i]:
-            last = i
-        dist_bwd[i] = last - i
-    dist = np.minimum(dist_fwd, dist_bwd)
-    dist[is_hol] = 0
-    future['Distance_to_Holiday'] = dist
+    calendar = _derive_calendar(future['Is_NationalHoliday'].to_numpy(dtype=bool), future['Is_Weekend'].to_numpy(dtype=bool))
+    for col, values in calendar.items():
+        future[col] = values
 
     # Date parts
-    future['Day_of_Week']  = pd.to_datetime(future['Date']).dt.dayofweek
-    future['Day_of_Month'] = pd.to_datetime(future['Date']).dt.day
-    future['Month']        = pd.to_datetime(future['Date']).dt.month
-    future['Year']         = pd.to_datetime(future['Date']).dt.year
+    _add_date_parts(future)
 
     return future
 
 def _clean_boolean_columns(df: pd.DataFrame) -> pd.DataFrame:
-    for c in df.columns:
-        if df[c].dtype == bool:
-            df[c] = df[c].astype(int)
-        elif df[c].dtype == object:
-            uniq = set(pd.unique(df[c].dropna()))
-            if uniq <= {"True", "False"}:
-                df[c] = df[c].map({"False": 0, "True": 1}).astype('Int64').fillna(0).astype(int)
+    """Turn bool columns, and object columns holding only "True"/"False" strings (missing -> 0), into 0/1"""
+    bool_cols = df.select_dtypes(bool).columns
+    if len(bool_cols):
+        df[bool_cols] = df[bool_cols].astype(np.uint8)
+    obj = df.select_dtypes(object)
+    flag_cols = obj.columns[(obj.isin(["True", "False"]) | obj.isna()).all()]
+    if len(flag_cols):
+        df[flag_cols] = obj[flag_cols].eq("True").astype(np.uint8)
     return df
 
+def _compact_features(X: pd.DataFrame) -> pd.DataFrame:
+    """Downcast numeric feature columns to float32, the dtype sklearn's trees split on.
+
+    Random forests convert their input to float32 anyway; doing it up front skips the float64/int64
+    intermediate. Categorical columns (hgb native categories) are left as they are.
+    """
+    numeric = X.columns[[not isinstance(t, pd.CategoricalDtype) for t in X.dtypes]]
+    return X.astype({c: np.float32 for c in numeric})
+
+def _make_regressor(kind: str = FORECAST_MODEL, n_jobs: int = -1):
+    """Regressor used for both the occupancy and ARR models, chosen by FORECAST_MODEL"""
+    if kind == 'hgb':
+        return HistGradientBoostingRegressor(max_iter=400, max_leaf_nodes=63, min_samples_leaf=2, random_state=0,
+                                             categorical_features='from_dtype')
+    return RandomForestRegressor(n_estimators=400, random_state=0, min_samples_leaf=2, n_jobs=n_jobs)
+
+def _write(df: pd.DataFrame, path_no_ext: str) -> str:
+    """Write df to <path_no_ext>.parquet (zstd) and, unless WRITE_CSV=0, <path_no_ext>.csv; returns the paths written"""
+    paths = [f"{path_no_ext}.parquet"]
+    df.to_parquet(paths[0], engine='pyarrow', compression='zstd', index=False)
+    if WRITE_CSV:
+        paths.append(f"{path_no_ext}.csv")
+        df.to_csv(paths[1], index=False)
+    return ", ".join(paths)
+
+@_MEMORY.cache
+def _fit_model(estimator, X: pd.DataFrame, y: pd.Series):
+    """Fit an unfitted estimator; reruns with the same hyperparameters and data load the pickled model instead"""
+    return estimator.fit(X, y)
+
 def ml_predict_occupancy_and_arr(hist_df: pd.DataFrame, holidays_df: pd.DataFrame):
     """Train RF for occupancy and ARR, then predict for 2026. Returns (occ_df, arr_df)."""
     # Occupancy RF
-    daily_df = hist_df[['Date', 'Occupancy Rate', 'Is_Holiday', 'Is_Weekend', 'Is_Event', 'Is_SchoolHoliday']].copy()
+    daily_df = hist_df[['Date', 'Occupancy Rate', 'Is_Holiday', 'Is_Weekend', 'Is_Event', 'Is_SchoolHoliday']]
     enrich = _build_enrich_calendar_features(daily_df)
     target_occ = 'Occupancy Rate'
     drop_cols = ['Date', 'Year', target_occ]
     features_occ = [c for c in enrich.columns if c not in drop_cols]
     X_full = enrich[features_occ].copy()
     y_full = enrich[target_occ].astype(float).clip(1e-6, 1 - 1e-6)
-    X_full = _clean_boolean_columns(X_full)
-    rf_occ = RandomForestRegressor(n_estimators=400, random_state=0, min_samples_leaf=2, n_jobs=-1)
-    rf_occ.fit(X_full, y_full)
+    X_full = _compact_features(_clean_boolean_columns(X_full))
 
-    # Future calendar and occupancy prediction
-    # Start from day after latest historical date to avoid overlap with history
-    latest_hist_date = pd.to_datetime(enrich['Date'].max()) + pd.Timedelta(days=1)
-    future = _future_calendar_2026(holidays_df, start_date=latest_hist_date)
-    occ_feats = [
-        'Is_NationalHoliday', 'Is_Weekend', 'Is_Event', 'Is_SchoolHoliday',
-        'Is_Bridge', 'Is_Holiday', 'Holiday_Duration', 'Days_of_Holiday',
-        'Distance_to_Holiday', 'Day_of_Week', 'Day_of_Month', 'Month'
-    ]
-    X_future_occ = future[occ_feats].copy()
-    X_future_occ = _clean_boolean_columns(X_future_occ)
-    future['Forecasted_Occ'] = rf_occ.predict(X_future_occ)
-
-    # ARR RF
-    arrtrain = hist_df.copy()
+    # ARR RF training set
+    arrtrain = hist_df
     if 'Occupancy Rate' in arrtrain.columns:
         arrtrain = arrtrain.drop(columns=['Occupancy Rate', 'Is_Holiday', 'Is_Weekend', 'Is_Event', 'Is_SchoolHoliday'])
     arrtrain = pd.merge(arrtrain, enrich.drop(columns=['Occupancy Rate']), on='Date', how='left')
 
-    trainset = arrtrain.sort_values('Date').copy()
+    trainset = arrtrain.sort_values('Date')
     target_arr = 'Average Room Rate'
     drop_arr = ['Date', 'Year', target_arr]
     features_arr = [c for c in trainset.columns if c not in drop_arr]
 
-    # One-hot for categories
+    # Categories: native categorical splits for hgb, one-hot for the random forest
     cat_cols = []
     for c in ['Room Type', 'Arrangement']:
         if c in features_arr and trainset[c].dtype == object:
             cat_cols.append(c)
+    native_cats = FORECAST_MODEL == 'hgb'
+    cat_dtypes = {c: pd.CategoricalDtype(trainset[c].dropna().unique()) for c in cat_cols}
     X_train_raw = trainset[features_arr].copy()
-    if len(cat_cols):
+    if native_cats:
+        X_train = X_train_raw.astype(cat_dtypes)
+    elif len(cat_cols):
         X_train = pd.get_dummies(X_train_raw, columns=cat_cols, drop_first=False)
     else:
         X_train = X_train_raw
-    X_train = _clean_boolean_columns(X_train)
+    X_train = _compact_features(_clean_boolean_columns(X_train))
     model_cols = X_train.columns.tolist()
     y_train = trainset[target_arr].astype(float)
 
-    rf_arr = RandomForestRegressor(n_estimators=400, random_state=0, min_samples_leaf=2, n_jobs=-1)
-    rf_arr.fit(X_train, y_train)
+    # Both models train on history only, so they fit concurrently (sklearn's tree building releases the GIL).
+    # Each fit gets half the cores: forest workers via n_jobs, hgb's OpenMP pool via threadpool_limits
+    half_cores = max(1, (os.cpu_count() or 1) // 2)
+    with threadpool_limits(limits=half_cores), ThreadPoolExecutor(max_workers=2) as pool:
+        occ_fit = pool.submit(_fit_model, _make_regressor(n_jobs=half_cores), X_full, y_full)
+        arr_fit = pool.submit(_fit_model, _make_regressor(n_jobs=half_cores), X_train, y_train)
+        rf_occ, rf_arr = occ_fit.result(), arr_fit.result()
+    _MEMORY.reduce_size(bytes_limit=_CACHE_BYTES_LIMIT)
+
+    # Future calendar and occupancy prediction
+    # Start from day after latest historical date to avoid overlap with history
+    latest_hist_date = enrich['Date'].max() + pd.Timedelta(days=1)
+    future = _future_calendar_2026(holidays_df, start_date=latest_hist_date)
+    occ_feats = [
+        'Is_NationalHoliday', 'Is_Weekend', 'Is_Event', 'Is_SchoolHoliday',
+        'Is_Bridge', 'Is_Holiday', 'Holiday_Duration', 'Days_of_Holiday',
+        'Distance_to_Holiday', 'Day_of_Week', 'Day_of_Month', 'Month'
+    ]
+    X_future_occ = future[occ_feats].copy()
+    X_future_occ = _compact_features(_clean_boolean_columns(X_future_occ))
+    future['Forecasted_Occ'] = rf_occ.predict(X_future_occ)
 
     # Build future cartesian for ARR
     pairs = hist_df[['Room Type', 'Arrangement']].dropna().drop_duplicates()
-    future_pairs = future.copy()
-    future_pairs['__k'] = 1
-    pairs_ = pairs.copy(); pairs_['__k'] = 1
-    arrfuture = future_pairs.merge(pairs_, on='__k', how='outer').drop(columns='__k')
-    arrfuture = arrfuture.rename(columns={'Forecasted_Occ': 'Predicted_Occupancy'})
+    arrfuture = future.merge(pairs, how='cross').rename(columns={'Forecasted_Occ': 'Predicted_Occupancy'})
 
     # Features for inference must match model_cols
     base_feats = [
@@ -268,23 +269,24 @@ def ml_predict_occupancy_and_arr(hist_df: pd.DataFrame, holidays_df: pd.DataFram
     base_feats = [c for c in base_feats if c in features_arr]
     infer_cols = base_feats + cat_cols
     X_future_arr_raw = arrfuture[infer_cols].copy()
-    if len(cat_cols):
+    if native_cats:
+        X_future_arr = X_future_arr_raw.astype(cat_dtypes)
+    elif len(cat_cols):
         X_future_arr = pd.get_dummies(X_future_arr_raw, columns=cat_cols, drop_first=False)
     else:
         X_future_arr = X_future_arr_raw
     # Always align features and predict regardless of categorical presence
     X_future_arr = _clean_boolean_columns(X_future_arr)
-    X_future_arr = X_future_arr.reindex(columns=model_cols, fill_value=0)
+    X_future_arr = _compact_features(X_future_arr.reindex(columns=model_cols, fill_value=0))
     arrfuture['Forecasted_ARR'] = rf_arr.predict(X_future_arr)
 
     # Return in schemas used by combine_forecasts
-    occ_out = future[['Date', 'Forecasted_Occ', 'Is_Holiday', 'Is_Weekend', 'Is_SchoolHoliday', 'Is_Event']].copy()
+    occ_out = future[['Date', 'Forecasted_Occ', 'Is_Holiday', 'Is_Weekend', 'Is_SchoolHoliday', 'Is_Event']]
     # Map Is_Holiday here is the final holiday flag from engineered future
-    arr_out = arrfuture[['Date', 'Room Type', 'Forecasted_ARR', 'Predicted_Occupancy', 'Is_Holiday', 'Is_Weekend', 'Is_SchoolHoliday', 'Is_Event', 'Is_Bridge']].copy()
+    arr_out = arrfuture[['Date', 'Room Type', 'Forecasted_ARR', 'Predicted_Occupancy', 'Is_Holiday', 'Is_Weekend', 'Is_SchoolHoliday', 'Is_Event', 'Is_Bridge']]
 
     # Also emit flat predictions schema for transparency/debugging
-    transparent = arrfuture.copy()
-    transparent = transparent.rename(columns={
+    transparent = arrfuture.rename(columns={
         'Predicted_Occupancy': 'Occupancy Rate',
         'Forecasted_ARR': 'ARR_pred'
     })
@@ -294,10 +296,9 @@ def ml_predict_occupancy_and_arr(hist_df: pd.DataFrame, holidays_df: pd.DataFram
         'Occupancy Rate','Room Type','Arrangement','ARR_pred'
     ]
     keep_cols = [c for c in keep_cols if c in transparent.columns]
-    transparent_out = transparent[keep_cols].copy()
-    # Save to data/predictions.csv
-    transparent_out.to_csv('data/predictions.csv', index=False)
-    print('Saved transparent predictions: data/predictions.csv')
+    transparent_out = transparent[keep_cols]
+    # Save to data/predictions.parquet (+ .csv)
+    print(f"Saved transparent predictions: {_write(transparent_out, 'data/predictions')}")
     return occ_out, arr_out
 
 def combine_forecasts(occupancy_forecast: pd.DataFrame, arr_forecast: pd.DataFrame, historical_df: pd.DataFrame) -> pd.DataFrame:
@@ -305,57 +306,47 @@ def combine_forecasts(occupancy_forecast: pd.DataFrame, arr_forecast: pd.DataFra
 
     - Historical (all rows in historical_df): use actuals as forecasted, zero error.
     - Forecast (based on occupancy_forecast dates, merged with arr_forecast per Room Type).
+    All three frames carry datetime64 Date columns (see _load).
     """
-    final_rows = []
-
     # Historical portion (retain original schema expectations)
-    hist_df = historical_df.copy()
-    hist_df['Date'] = pd.to_datetime(hist_df['Date'])
-    for _, r in hist_df.iterrows():
-        final_rows.append({
-            'Date': r['Date'],
-            'Room Type': r.get('Room Type'),
-            'Average Room Rate': r.get('Average Room Rate'),
-            'Occ': r.get('Occupancy Rate'),
-            'Forecasted ARR': r.get('Average Room Rate'),
-            'Forecasted Occ': r.get('Occupancy Rate'),
-            'Error ARR': 0,
-            'Error Occ': 0,
-            'Is_Holiday': r.get('Is_Holiday', False),
-            'Is_Weekend': r.get('Is_Weekend', False),
-            'Is_SchoolHoliday': r.get('Is_SchoolHoliday', False),
-            'Is_Event': r.get('Is_Event', False),
-            'holiday_block_length': 0,
-            'Is_Bridge': False,
-        })
+    hist_block = pd.DataFrame({
+        'Date': historical_df['Date'],
+        'Room Type': historical_df.get('Room Type'),
+        'Average Room Rate': historical_df.get('Average Room Rate'),
+        'Occ': historical_df.get('Occupancy Rate'),
+        'Forecasted ARR': historical_df.get('Average Room Rate'),
+        'Forecasted Occ': historical_df.get('Occupancy Rate'),
+        'Error ARR': 0,
+        'Error Occ': 0,
+        'Is_Holiday': historical_df.get('Is_Holiday', False),
+        'Is_Weekend': historical_df.get('Is_Weekend', False),
+        'Is_SchoolHoliday': historical_df.get('Is_SchoolHoliday', False),
+        'Is_Event': historical_df.get('Is_Event', False),
+        'holiday_block_length': 0,
+        'Is_Bridge': False,
+    })
 
     # Forecast portion (2026): join occupancy and ARR
-    occ = occupancy_forecast.copy()
-    occ['Date'] = pd.to_datetime(occ['Date'])
-    arr = arr_forecast.copy()
-    arr['Date'] = pd.to_datetime(arr['Date'])
-
     # For each date in occupancy forecast, attach all ARR rows with same date
-    merged = arr.merge(occ, on='Date', how='left', suffixes=('', '_occ'))
-    for _, r in merged.iterrows():
-        final_rows.append({
-            'Date': r['Date'],
-            'Room Type': r.get('Room Type'),
-            'Average Room Rate': None,
-            'Occ': None,
-            'Forecasted ARR': r.get('Forecasted_ARR'),
-            'Forecasted Occ': r.get('Forecasted_Occ'),
-            'Error ARR': None,
-            'Error Occ': None,
-            'Is_Holiday': r.get('Is_Holiday'),
-            'Is_Weekend': r.get('Is_Weekend'),
-            'Is_SchoolHoliday': r.get('Is_SchoolHoliday'),
-            'Is_Event': r.get('Is_Event'),
-            'holiday_block_length': r.get('holiday_block_length', 0),
-            'Is_Bridge': r.get('Is_Bridge', False),
-        })
-
-    final_df = pd.DataFrame(final_rows)
+    merged = arr_forecast.merge(occupancy_forecast, on='Date', how='left', suffixes=('', '_occ'))
+    forecast_block = pd.DataFrame({
+        'Date': merged['Date'],
+        'Room Type': merged.get('Room Type'),
+        'Average Room Rate': np.nan,
+        'Occ': np.nan,
+        'Forecasted ARR': merged.get('Forecasted_ARR'),
+        'Forecasted Occ': merged.get('Forecasted_Occ'),
+        'Error ARR': np.nan,
+        'Error Occ': np.nan,
+        'Is_Holiday': merged.get('Is_Holiday'),
+        'Is_Weekend': merged.get('Is_Weekend'),
+        'Is_SchoolHoliday': merged.get('Is_SchoolHoliday'),
+        'Is_Event': merged.get('Is_Event'),
+        'holiday_block_length': merged.get('holiday_block_length', 0),
+        'Is_Bridge': merged.get('Is_Bridge', False),
+    })
+
+    final_df = pd.concat([hist_block, forecast_block], ignore_index=True)
     final_df = final_df.sort_values(['Date', 'Room Type']).reset_index(drop=True)
     return final_df
 
@@ -368,31 +359,34 @@ def evaluate_forecast(final_df: pd.DataFrame, historical_df: pd.DataFrame) -> No
     except Exception as e:
         print(f"Evaluation summary skipped: {e}")
 
-if __name__ == "__main__":
-    # Load historical data
-    hist_df = pd.read_csv("data/dataset_processed.csv")
-    hist_df["Date"] = pd.to_datetime(hist_df["Date"])
-    
-    # Load holidays (for building 2026 calendar)
-    holidays_df = pd.read_csv("data/holidays_info.csv")
-    holidays_df["Date"] = pd.to_datetime(holidays_df["Date"])
-    
-    # Train and predict using ML models (occupancy then ARR)
-    occupancy_forecast, arr_forecast = ml_predict_occupancy_and_arr(hist_df, holidays_df)
-
-    # Save ARR predictions for compatibility
-    arr_forecast.to_csv("data/arr_forecast_2026.csv", index=False)
-    print("Saved ARR forecast: data/arr_forecast_2026.csv")
-
-    # Combine to enhanced_forecasting_2026.csv compatible with frontend
-    final_df = combine_forecasts(occupancy_forecast, arr_forecast, hist_df)
-    final_df.to_csv("data/enhanced_forecasting_2026.csv", index=False)
-    print("Saved forecast: data/enhanced_forecasting_2026.csv")
-
-    # Optional evaluation if historical overlap exists
-    try:
-        evaluate_forecast(final_df, hist_df)
-    except Exception as e:
-        print(f"Evaluation skipped: {e}")
+def main() -> pd.DataFrame:
+    """Train on dataset_processed, write the 2026 forecasts and return the combined forecast frame"""
+    # Copy-on-write lets the selections/renames/assigns below share buffers until one is written
+    with pd.option_context('mode.copy_on_write', True):
+        # Load historical data
+        hist_df = _load("data/dataset_processed.csv")
+
+        # Load holidays (for building 2026 calendar)
+        holidays_df = _load("data/holidays_info.csv")
+
+        # Train and predict using ML models (occupancy then ARR)
+        occupancy_forecast, arr_forecast = ml_predict_occupancy_and_arr(hist_df, holidays_df)
 
-    print("\n=== ML-BASED FORECASTING (Notebook-aligned) COMPLETED ===")
\ No newline at end of file
+        # Save ARR predictions for compatibility
+        print(f"Saved ARR forecast: {_write(arr_forecast, 'data/arr_forecast_2026')}")
+
+        # Combine to enhanced_forecasting_2026.csv compatible with frontend
+        final_df = combine_forecasts(occupancy_forecast, arr_forecast, hist_df)
+        print(f"Saved forecast: {_write(final_df, 'data/enhanced_forecasting_2026')}")
+
+        # Optional evaluation if historical overlap exists
+        try:
+            evaluate_forecast(final_df, hist_df)
+        except Exception as e:
+            print(f"Evaluation skipped: {e}")
+
+        print("\n=== ML-BASED FORECASTING (Notebook-aligned) COMPLETED ===")
+        return final_df
+
+if __name__ == "__main__":
+    main()
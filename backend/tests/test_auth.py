@@ -0,0 +1,37 @@
+"""Login input that bcrypt cannot hash is rejected as invalid credentials"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth import authenticate_user, hash_password, verify_password
+from app.revenue_management_app import app
+
+
+class PasswordInputTest(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def login(self, password):
+        return self.client.post('/api/auth/login', json={'username': 'demo', 'password': password})
+
+    def test_valid_login(self):
+        self.assertEqual(self.login('demo123').status_code, 200)
+
+    def test_password_over_72_bytes(self):
+        long_password = 'demo123' + 'x' * 80
+        self.assertIsNone(authenticate_user('demo', long_password))
+        self.assertFalse(verify_password(long_password, hash_password('demo123')))
+        self.assertEqual(self.login(long_password).status_code, 401)
+
+    def test_non_string_password(self):
+        self.assertIsNone(authenticate_user('demo', 12345))
+        self.assertFalse(verify_password(12345, hash_password('12345')))
+        self.assertEqual(self.login(12345).status_code, 401)
+        self.assertEqual(self.login(['demo123']).status_code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
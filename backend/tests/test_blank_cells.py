@@ -0,0 +1,47 @@
+"""Blank cells in combined_df.csv must not stop the API from serving the file"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.revenue_management_app import RevenueManager
+from scripts.csv_to_parquet import convert_combined
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'combined_df_blank_cells.csv')
+
+
+class BlankCellsTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir)
+        shutil.copy(FIXTURE, os.path.join(self.data_dir, 'combined_df.csv'))
+        self.manager = RevenueManager()
+        self.manager.data_dir = self.data_dir
+
+    def assert_serves_every_row(self):
+        self.manager.load_cached_data()
+        recs = self.manager.get_pricing_recommendation('2024-01-01', '2024-01-02')
+        self.assertEqual(len(recs), 4)
+        blank_duration, blank_holiday, blank_weekend = recs[0], recs[1], recs[2]
+        self.assertEqual(blank_duration['holiday_duration'], 0)
+        self.assertFalse(blank_holiday['is_holiday'])
+        self.assertEqual(blank_holiday['day_of_week'], 'Unknown')
+        self.assertFalse(blank_weekend['is_weekend'])
+        self.assertEqual(blank_weekend['distance_to_holiday'], 0)
+
+    def test_csv(self):
+        self.assert_serves_every_row()
+        self.assertIsNone(self.manager._data.combined_ds)
+
+    def test_parquet(self):
+        convert_combined(os.path.join(self.data_dir, 'combined_df.csv'), os.path.join(self.data_dir, 'combined_df.parquet'))
+        self.assert_serves_every_row()
+        self.assertIsNotNone(self.manager._data.combined_ds)
+
+
+if __name__ == '__main__':
+    unittest.main()